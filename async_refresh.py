@@ -0,0 +1,105 @@
+"""Asyncio refresher: one event loop drives every query, region and write.
+
+Same cycle as cache_data.refresh_data, but the auction_stats and country
+queries are submitted together and polled without blocking, each with a
+deadline after which the job is cancelled, and every region's snapshot is
+written through one async Redis client. Run it instead of refresh_cache.py:
+
+    python async_refresh.py
+"""
+import asyncio
+import logging
+
+from config import CONFIG, logger
+from cache_data import (read_previous_snapshots, plan_map_refresh, merge_map_refresh, build_snapshots,
+                        stats_datasets_due, keep_datasets, merge_stats_datasets)
+from data_service import fetch_stats_columns_async, fetch_map_columns_async
+from kpi_history import record_kpis_async
+from redis_client import async_redis
+from refresh_policy import after_refresh, is_due, seconds_until_due, LIVE_SECONDS
+from regions import region_values
+from snapshot_archive import archive_snapshots
+from snapshot_cache import publish_async
+
+# BigQuery jobs still running after this long are cancelled
+QUERY_DEADLINE_SECONDS = CONFIG.get("QUERY_DEADLINE_SECONDS", 120)
+MIN_SLEEP_SECONDS = 5
+
+
+async def fetch_stats_async(region_vals, deadline=None):
+    """cache_data.fetch_stats with the due column groups queried together
+
+    The re-queried groups are kept (in one round trip) before returning.
+    """
+    groups, due = await asyncio.to_thread(stats_datasets_due)
+    results = await asyncio.gather(*(
+        fetch_stats_columns_async(region_vals, deadline=deadline, dataset=name) for name in due
+    ))
+    fetched = {name: columns for name, columns in zip(due, results) if columns is not None}
+    await asyncio.to_thread(keep_datasets, fetched)
+    if len(fetched) < len(due):
+        return None, fetched
+    groups.update(fetched)
+    return merge_stats_datasets(groups), fetched
+
+
+async def refresh_once(redis_conn):
+    """One refresh cycle; True if every region was published"""
+    logger.info("🌀 Running async refresh")
+    try:
+        previous = await asyncio.to_thread(read_previous_snapshots)
+        full, watermark = plan_map_refresh(previous)
+
+        # Both queries run in BigQuery at the same time
+        (stats_columns, fetched), map_columns = await asyncio.gather(
+            fetch_stats_async(region_values(), deadline=QUERY_DEADLINE_SECONDS),
+            fetch_map_columns_async(region_values(), since=watermark, deadline=QUERY_DEADLINE_SECONDS),
+        )
+        maps = merge_map_refresh(previous, map_columns, full)
+        snapshots = build_snapshots(previous, maps, stats_columns)
+
+        refresh = await asyncio.to_thread(
+            after_refresh, {region: data["kpis"] for region, data in snapshots.items()},
+            queries=len(fetched) + int(map_columns is not None))
+        for data in snapshots.values():
+            data["refresh"] = refresh
+
+        await asyncio.gather(*(
+            publish_async(redis_conn, data, region=region) for region, data in snapshots.items()
+        ))
+        await asyncio.to_thread(archive_snapshots, snapshots)
+        # Column groups all reused from their TTL cache add no new trend point
+        if stats_columns and fetched:
+            results = await asyncio.gather(*(
+                record_kpis_async(redis_conn, data["kpis"], region=region) for region, data in snapshots.items()
+            ), return_exceptions=True)
+            for error in results:
+                if isinstance(error, Exception):
+                    logger.warning(f"⚠️ Could not record KPI history: {str(error)}")
+
+        for region, data in snapshots.items():
+            logger.info(f"✅ Cache refreshed successfully for {region} at {data['last_refreshed']} (version {data['version']})")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error refreshing data: {str(e)}")
+        return False
+
+
+async def run_forever():
+    redis_conn = async_redis()
+    try:
+        while True:
+            wait = MIN_SLEEP_SECONDS
+            if await asyncio.to_thread(is_due):
+                if not await refresh_once(redis_conn):
+                    wait = LIVE_SECONDS
+            wait = max(wait, await asyncio.to_thread(seconds_until_due))
+            logger.info(f"🕒 Sleeping for {wait:.0f} seconds...")
+            await asyncio.sleep(wait)
+    finally:
+        await redis_conn.aclose()
+
+
+if __name__ == "__main__":
+    logging.info("⏱ Starting async refresher...")
+    asyncio.run(run_forever())
@@ -1,38 +1,39 @@
 from dash import Dash, html, dcc
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
-from flask import jsonify,request
+from flask import jsonify,request,Response
 from datetime import datetime
-from zoneinfo import ZoneInfo
-import pandas as pd
-import os
 import logging
 import dash
-import plotly.express as px
+import plotly.graph_objects as go
+import plotly.utils
 from config import CONFIG, logger
-from data_service import fetch_map_data_safe, fetch_bidder_summary_safe
-from flask_caching import Cache
-from redis import Redis
 from rq import Queue
 import json
-from cache_data import refresh_data
+from refresh_jobs import enqueue_refresh
+from snapshot_cache import get_sections, cache_stats
+from kpi_history import get_series, HISTORY_INTERVAL_SECONDS
+from regions import DEFAULT_REGION, resolve_region, region_label
+from redis_client import get_redis, pool_stats
+from snapshot_delta import build_delta, load_view, record_send, delta_stats
+from circuit_breaker import breaker_stats
+from readiness import readiness, start_warm_start
+from render_cache import init_render_cache, cached_render, render_cache_stats
+from refresh_policy import client_interval_ms, policy_stats
+from geo_shapes import SHAPES_URL, map_mode, shape_names
+from kiosk import RENDERERS as KIOSK_PAGES, kiosk_page
+from view_format import TODAY_TILES, LY_TILES, MAX_MARKER_SIZE, tile_id, format_value, kpi_labels, map_labels
 import logging
-import yaml
-import sys
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 
-# 💥 Warm-up: refresh cache immediately
-try:
-    refresh_data()
-    logging.info("✅ Initial cache refresh completed successfully.")
-except Exception as e:
-    logging.error("⚠️ Initial cache refresh failed:", exc_info=e)
+# 💥 Warm start: load the newest Redis/file snapshot in the background
+# (no BigQuery round trip); /readyz reports ready once it has
+start_warm_start()
 
 
 # Caching config (file-based, can swap with Redis later)
@@ -46,63 +47,28 @@ except Exception as e:
 
 # task_queue = Queue('default', connection=redis_conn)
 
-# Load YAML config
-config_path = os.path.join("config", "redis_config.yml")
-try:
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-except FileNotFoundError:
-    logger.error(f"❌ Config file not found: {config_path}")
-    sys.exit(1)
-except yaml.YAMLError as e:
-    logger.error(f"❌ Failed to parse YAML config: {e}")
-    sys.exit(1)
-
-if "redis" not in config:
-    logger.error("❌ Missing 'redis' section in config file")
-    sys.exit(1)
-
-redis_cfg = config["redis"]
-
-required_keys = ["host", "port", "db", "password", "client_name"]
-for key in required_keys:
-    if key not in redis_cfg:
-        logger.error(f"❌ Missing required key '{key}' in redis config")
-        sys.exit(1)
-
-password = os.getenv("REDIS_PASSWORD", redis_cfg.get("password"))
-
-# Redis connection
-redis_conn = Redis(
-    host=redis_cfg["host"],
-    port=redis_cfg["port"],
-    db=redis_cfg.get("db", 0),
-    password=password,
-    socket_timeout=redis_cfg.get("socket_timeout", 5),
-    socket_connect_timeout=redis_cfg.get("socket_connect_timeout", 5),
-    retry_on_timeout=redis_cfg.get("retry_on_timeout", True),
-    client_name=redis_cfg.get("client_name", "g2-auctionStats"),
-)
+# Shared, pooled Redis connection (cache_data uses the same pool)
+redis_conn = get_redis()
 
 task_queue = Queue("default", connection=redis_conn)
 
-# Load cached data if available
-def get_cached_data():
-    try:
-        with open("cache/auction_data.json") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.info("No cached file found. Enqueuing refresh job.")
-        task_queue.enqueue("cache_data.refresh_data")
-        return {}
+# Every page reads the snapshot (local -> Redis -> file) through its view model
+def get_view(view, region=DEFAULT_REGION):
+    """(view model, version) precomputed at publish time; ({}, None) on a miss"""
+    model, version = load_view(view, region)
+    if model is None:
+        # Deduplicated: every screen missing at once still queues one refresh
+        logger.info("No cached snapshot found. Enqueuing refresh jobs.")
+        enqueue_refresh(force=True)
+        return {}, None
+    return model, version
 
 
 
 app = Dash(__name__, suppress_callback_exceptions=True)
 app.title = f"Auction Stats - {CONFIG['ENV_NAME'].upper()}"
 server = app.server
-
-cache = Cache(app.server, config={"CACHE_TYPE": "filesystem", "CACHE_DIR": "/tmp/cache"})
+init_render_cache(server)
 
 # Health check endpoint
 @server.route("/healthz")
@@ -113,6 +79,57 @@ def healthz():
         "version": CONFIG["VERSION"]
     }), 200
 
+# Readiness: snapshot age, source tier and refresher status per region.
+# 503 until the warm start has loaded a snapshot; ?strict=1 also fails on stale data
+@server.route("/readyz")
+def readyz():
+    report, status = readiness(strict=request.args.get("strict") == "1")
+    return jsonify(report), status
+
+# Connection pool metrics
+@server.route("/metrics")
+def metrics():
+    return jsonify({
+        "redis_pool": pool_stats(),
+        "snapshot_cache": cache_stats(),
+        "delta_updates": delta_stats(),
+        "refresh_policy": policy_stats(),
+        "breakers": breaker_stats(),
+        "render_cache": render_cache_stats()
+    }), 200
+
+# No-JS kiosk pages for low-power screens, e.g. /kiosk/kpi or /kiosk/map?region=us
+# Rendered once per snapshot version; the ETag lets an unchanged page reload as a 304.
+@server.route("/kiosk/<page>")
+def kiosk(page):
+    if page not in KIOSK_PAGES:
+        return "Unknown kiosk page", 404
+    region = resolve_region(request.query_string.decode())
+    view, version = get_view(page, region)
+    interval_ms = client_interval_ms(get_sections(["refresh"], region=region).get("refresh"))
+    refresh_seconds = (interval_ms or CONFIG["REFRESH_INTERVAL_MS"]) // 1000
+    response = Response(kiosk_page(page, view, version, region, refresh_seconds), mimetype="text/html")
+    if version is not None:
+        response.set_etag(f"{page}-{region}-{version}-{refresh_seconds}")
+    return response.make_conditional(request)
+
+# Intraday KPI trend (sparklines), served from the Redis history buffer
+# e.g. /api/kpi-trend?metric=bids_received&hours=6&region=all
+@server.route("/api/kpi-trend")
+def kpi_trend():
+    metrics = request.args.getlist("metric") or None
+    hours = request.args.get("hours", default=6, type=float)
+    region = resolve_region(request.query_string.decode())
+    try:
+        series = get_series(metrics, since=datetime.now().timestamp() - hours * 3600, region=region)
+    except Exception as e:
+        logger.error(f"KPI trend read failed: {e}")
+        return jsonify({"error": "trend data unavailable"}), 503
+    return jsonify({
+        "interval_seconds": HISTORY_INTERVAL_SECONDS,
+        "series": series
+    }), 200
+
 GLOSSARY_DATA = {
     # "Gross Value": "Total sale amount including Copart charges.",
     #"Vehicles Sold": "Total number of vehicles sold today.",
@@ -133,10 +150,13 @@ GRAY_BG = "#E9ECF1"
 # def get_glossary_term(title):
 #     return GLOSSARY_DATA.get(title, "")
 
-def kpi_card(title, value, is_currency=False, size="normal", subtitle=None, icon=None, show_icon=True, borderColor="#cecfd4", bg_color=GRAY_BG,tooltip=None):
+def kpi_card(title, value, is_currency=False, size="normal", subtitle=None, icon=None, show_icon=True, borderColor="#cecfd4", bg_color=GRAY_BG,tooltip=None, element_id=None):
     if tooltip is None:
         tooltip = GLOSSARY_DATA.get(title, "")
-    display_val = f"${value:,.0f}" if is_currency else f"{value:,.0f}"
+    # Values arrive preformatted from the view model; numbers are formatted here
+    display_val = value if isinstance(value, str) else format_value(value, is_currency)
+    # element_id lets delta updates patch the value in place
+    metric_id = {"id": element_id} if element_id else {}
 
     return html.Div([
         html.Div([
@@ -147,7 +167,7 @@ def kpi_card(title, value, is_currency=False, size="normal", subtitle=None, icon
                 # if icon else None,
                 html.Div(title.upper(), className="tileLabel")
             ], className="d-flex align-items-center justify-content-center"),
-            html.Div(display_val, className="tileMetric flash-target")
+            html.Div(display_val, className="tileMetric flash-target", **metric_id)
         ], className="tileValueWrapper"),
     ], className="tileWrapper", title=tooltip, style={
         "backgroundColor": bg_color,
@@ -188,9 +208,6 @@ def map_view():
     return html.Div([
     html.Div([
 
-        # Hidden Animation Trigger
-        html.Div(id="animation-trigger", style={"display": "none"}),
-
         # KPI + Refresh Time Row
         html.Div([
             html.Div([
@@ -249,12 +266,16 @@ def map_view():
             id="flash-interval",
             interval=21 * 1000,  # Set to 21 seconds to ensure next card appears after animation finishes
             n_intervals=0,
-            disabled=False  # Start enabled to show all countries
+            disabled=True  # Enabled clientside once the map has countries to show
         )
         ], style={"position": "relative"}),
 
-        # Auto refresh
-        dcc.Interval(id="interval-map", interval=CONFIG["REFRESH_INTERVAL_MS"], n_intervals=0)
+        # Auto refresh: each tick asks for the changes since map-version
+        dcc.Interval(id="interval-map", interval=CONFIG["REFRESH_INTERVAL_MS"], n_intervals=0),
+        dcc.Store(id="map-delta", storage_type="memory"),
+        dcc.Store(id="map-version", storage_type="memory"),
+        dcc.Store(id="map-model", storage_type="memory"),
+        dcc.Store(id="map-resync", data=0, storage_type="memory")
 
     ],
     className="data-container shadow rounded-4 mt-4",
@@ -286,7 +307,10 @@ def kpi_view():
                     className="flash-target",
                     style={ "color": "gray","display":"none"}
                 ),
-        dcc.Interval(id="interval-refresh", interval=CONFIG["REFRESH_INTERVAL_MS"], n_intervals=0)
+        dcc.Interval(id="interval-refresh", interval=CONFIG["REFRESH_INTERVAL_MS"], n_intervals=0),
+        dcc.Store(id="kpi-delta", storage_type="memory"),
+        dcc.Store(id="kpi-version", storage_type="memory"),
+        dcc.Store(id="kpi-resync", data=0, storage_type="memory")
     ], style={
                 "display": "flex",
                 # "gap": "2%"
@@ -322,11 +346,8 @@ app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
     dcc.Store(id="country-flash-store", data=[], storage_type="memory"),
     dcc.Store(id="info-content-visibility", data=True, storage_type="memory"),
+    # Only the routed page is built and mounted here (see render_page)
     html.Div(id='page-content'),
-    html.Div(id='page-glossary', children=glossary_view(), style={"display": "none"}),
-    html.Div(id='page-map', children=map_view(), style={"display": "none"}),
-    html.Div(id='page-kpi', children=kpi_view(), style={"display": "none"}),
-    html.Div(id='page-not-found', children=not_found_view(), style={"display": "none"}),
 ])
 
 # Callback for toggling the info panel content
@@ -350,31 +371,48 @@ def toggle_info_content(n_clicks, is_visible):
         # Show the content
         return {}, "▼", True
 
+# Routed pages, built on demand: a screen downloads and mounts only the view
+# it shows, and navigating away unmounts it (with its timers and figure)
+PAGES = {
+    "/": kpi_view,
+    "/kpi": kpi_view,
+    "/map": map_view,
+    "/glossary": glossary_view,
+}
+
 @app.callback(
-    Output("page-map", "style"),
-    Output("page-kpi", "style"),
-    Output("page-glossary", "style"),
-    Output("page-not-found", "style"),
+    Output("page-content", "children"),
     Input("url", "pathname")
 )
-def toggle_pages(pathname):
+def render_page(pathname):
     user_ip = request.remote_addr or "unknown"
     user_agent = request.headers.get("User-Agent", "unknown")
     # timestamp = datetime.utcnow().isoformat()
-    logger.info(f"User viewed {pathname} | IP: {user_ip} | Agent: {user_agent}")
+    logger.info(f"User viewed {pathname} | IP: {user_ip} | Agent: {user_agent}", extra={"sample": "page_view"})
 
-    return (
-        {"display": "block"} if pathname == "/map" else {"display": "none"},
-        {"display": "block"} if pathname in ["/","/kpi"] else {"display": "none"},
-        {"display": "block"} if pathname == "/glossary" else {"display": "none"},
-        {"display": "block"} if pathname not in ["/map", "/", "/kpi", "/glossary"] else {"display": "none"},
-    )
+    return PAGES.get(pathname, not_found_view)()
 # ------------------------------------------------------------------------
 # DataTable content callback (only applies when on /table)
 
-app.clientside_callback(
-    """
-     function(bidderCount, n_map, refreshTime) {
+# Split-flap animation and alert sound, run when a page shows a new snapshot.
+# Triggered by the page's version store, not its poll tick: a tick that finds
+# nothing new sends no delta, and a resync that re-renders the version already
+# on screen is skipped here, so an unchanged screen stays quiet.
+FLASH_ANIMATION_JS = """
+     function(seen) {
+        const nu = window.dash_clientside.no_update;
+        if (!seen || seen.version == null) {
+            return nu;
+        }
+        const trigger = (window.dash_clientside.callback_context.triggered || [])[0];
+        const key = trigger ? trigger.prop_id : "";
+        const shown = window.flashShownVersions = window.flashShownVersions || {};
+        const stamp = seen.version + "|" + seen.region;
+        if (shown[key] === stamp) {
+            return nu;
+        }
+        shown[key] = stamp;
+
         // Play alert sound first
         var audio = document.getElementById('refresh-alert-sound');
         if (audio) {
@@ -478,12 +516,22 @@ app.clientside_callback(
             animateSequentially(Array.from(kpiElements));
         }
 
-        return window.dash_clientside.no_update;
+        return nu;
     }
-    """,
+    """
+
+# One per routed page: each mounts only its own version store (render_page)
+app.clientside_callback(
+    FLASH_ANIMATION_JS,
     Output("animation-trigger", "children"),
-    Input("active-bidder-count", "children"),  
-    Input("interval-map", "n_intervals"),
+    Input("map-version", "data"),
+    prevent_initial_call=True
+)
+app.clientside_callback(
+    FLASH_ANIMATION_JS,
+    Output("animation-trigger", "children", allow_duplicate=True),
+    Input("kpi-version", "data"),
+    prevent_initial_call=True
 )
 
 @app.callback(
@@ -492,148 +540,112 @@ app.clientside_callback(
     Output("active-bidder-count", "children"),
     Output("country-info-panel", "children"), 
     Output("country-flash-store", "data"),
-    Input("interval-map", "n_intervals"),
+    Output("map-model", "data"),
+    Output("map-version", "data"),
+    Input("map-resync", "data"),
     Input("url", "pathname"),
+    Input("url", "search"),
     State("country-flash-store", "data")
     # prevent_initial_call=True
 )
-def update_map(n,pathname,prev_store):
+def update_map(resync,pathname,search,prev_store):
+    """Full render of the map view from its view model; later snapshots arrive as deltas"""
     if pathname != "/map":
         raise dash.exceptions.PreventUpdate
     
-    logger.info("Refreshing map view")
-    summary = fetch_bidder_summary_safe()
-    
-    bidders_val = summary.get("bidders")
-    active_bidders = f"{int(bidders_val):,}" if bidders_val else "-"    
-    
-    updated = (
-        pd.to_datetime(summary['last_up_date'])
-        .tz_localize('UTC')
-        .astimezone(ZoneInfo("America/Chicago"))
-        .strftime("Last Updated: %b %d, %Y %I:%M %p") if summary.get("last_up_date") else "Last Updated: -"
-    )
+    region = resolve_region(search)
+    logger.info(f"Refreshing map view ({region})", extra={"sample": "map_render"})
+    view, version = get_view("map", region)
+    seen = {"version": version, "region": region}
 
+    # Figure and panel are rendered once per snapshot version, region and map
+    # mode, shared by every screen; the flash store depends on this screen's own
+    (updated, figure, active_bidders, country_panel), nbytes = cached_render(
+        "update_map", version, (region, map_mode(search)), lambda: map_render(view, search))
 
-    logger.info(f"Last updated timestamp Map: {summary.get('last_up_date')}")
+    if not (view.get("points") or {}).get("names"):
+        # Return an empty list for country-flash-store
+        return updated, figure, active_bidders, country_panel, [], {}, seen
 
-    dataMap = get_cached_data()
-    dfMap = pd.DataFrame(dataMap.get("map", []))
+    # Countries pre-sorted by unique_bidders (descending) at publish time
+    rank = view.get("rank") or []
 
-    logger.debug(f"Fetched {len(dfMap)} rows for map")
+    prev_map = {item["country"]: item["count"] for item in (prev_store or [])}
 
-    if dfMap.empty or "lat" not in dfMap.columns or "long" not in dfMap.columns:
-        fig = px.scatter_mapbox(
-            pd.DataFrame(columns=["lat", "long"]),
-            lat="lat", lon="long",
-            zoom=2, mapbox_style="carto-positron"
-        )
-        empty_panel = html.Div("No country data available", className="text-muted")
-        # Return an empty list for country-flash-store
-        return updated, fig, bidders_val, empty_panel, []
+    # Show every country in flash cards again, flagging the ones that changed
+    new_store = [
+        {
+            "country": country_name,
+            "count": count,
+            "displayed": False,
+            "changed": prev_map.get(country_name) != count,
+            "index": i
+        }
+        for i, (country_name, count) in enumerate(rank)
+    ]
 
+    record_send("map", "full_renders", nbytes)
+    return updated, figure, active_bidders, country_panel, new_store, view.get("countries", {}), seen
 
-    if "country_long_name" in dfMap.columns and "unique_bidders" in dfMap.columns:
-        # Sort by unique_bidders descending
-        df_sorted = dfMap.sort_values("unique_bidders", ascending=False)
 
+def map_render(view, search):
+    """Version-dependent outputs of the map view's full render, and their size in bytes"""
+    text = view.get("text") or map_labels({})
+    if not (view.get("points") or {}).get("names"):
+        return (text["refresh-time-map"], render_map_figure({}, search), text["active-bidder-count"],
+                html.Div("No country data available", className="text-muted")), 0
+
+    if view.get("rank"):
         country_panel = [
 	        html.Div([
-	            html.Span(row["country_long_name"]),
-	            html.Span(f"{int(row['unique_bidders']):,}", className="bidder-count")
+	            html.Span(country_name),
+	            html.Span(count_text, className="bidder-count")
 	        ], className="country-item")
-	        for _, row in df_sorted.iterrows()
+	        for country_name, count_text in view["panel"]
 	    ]
     else:
         country_panel = html.Div("No country data available", className="info-title text-muted")
 
-    prev_map = {item["country"]: item["count"] for item in (prev_store or [])}
-    
-    # Create new store with all countries, marking which ones have changed
-    new_store = []
-    for _, r in df_sorted.iterrows():
-        country_name = r["country_long_name"]
-        count = int(r["unique_bidders"]) if r["unique_bidders"] else 0
-        # Mark as not displayed if the count changed or it's a new country
-        is_changed = prev_map.get(country_name) != count
-        new_store.append({
-            "country": country_name,
-            "count": count,
-            "displayed": not is_changed,  # Only mark as not displayed if changed
-            "changed": is_changed
-        })
-    
-    # For initial display, show the first flash card
-    flash_card = None
-    for item in new_store:
-        if not item["displayed"]:
-            flash_card = html.Div([
-                html.Div(item["country"], className="flash-country"),
-                html.Div(f"{item['count']:,} Bidders", className="flash-count"),
-                html.Div(html.Div(className="flash-progress-inner"), className="flash-progress")
-            ], className="flash-card")
-            # Don't mark as displayed yet - let the interval callback handle it
-            break
-
-    # Clean and ensure numeric types
-    dfMap = dfMap.dropna(subset=["lat", "long", "bid_counts"])  # Drop rows with missing required values
-    dfMap["lat"] = pd.to_numeric(dfMap["lat"], errors="coerce")
-    dfMap["long"] = pd.to_numeric(dfMap["long"], errors="coerce")
-    dfMap["bid_counts"] = pd.to_numeric(dfMap["bid_counts"], errors="coerce")
-    dfMap["unique_bidders"] = pd.to_numeric(dfMap["unique_bidders"], errors="coerce")
-    dfMap["dollars_bid"] = pd.to_numeric(dfMap["dollars_bid"], errors="coerce")
-    dfMap["highest_bid_placed"] = pd.to_numeric(dfMap["highest_bid_placed"], errors="coerce")
-
-    # Drop any rows with null lat/lon
-    dfMap = dfMap.dropna(subset=["lat", "long"])
-
-    # Format values
-    dfMap['lat'] = dfMap['lat'].round(2)
-    dfMap['long'] = dfMap['long'].round(2)
-    # dfMap["marker_size"] = dfMap["bid_counts"].clip(lower=20)
-
-    min_size = 2
-    max_size = 25
-
-    min_bid = dfMap["unique_bidders"].min()
-    max_bid = dfMap["unique_bidders"].max()
-
-    # Avoid divide-by-zero
-    if min_bid == max_bid:
-        dfMap["marker_size"] = min_size
-    else:
-        dfMap["marker_size"] = min_size + (dfMap["unique_bidders"] - min_bid) * (max_size - min_size) / (max_bid - min_bid)
-
-    # Add realtime flag using last_5_minutes estimation:
-    dfMap["is_live"] = dfMap["unique_bidders"] > 0  # you can customize this condition
-
-    # Use different marker color or size for live participants:
-    dfMap["marker_color"] = dfMap["is_live"].map(lambda x: "#00b050" if x else  "#00ff00")
-
-    fig = px.scatter_mapbox(
-        dfMap,
-        lat="lat",
-        lon="long",
-        # text="country_long_name",
-        size="marker_size",           # Pre-scaled column
-        size_max=max_size, 
-        # size_min=15,
-        hover_name="country_long_name",
-        hover_data={
-            "country_long_name": False,
-            "bid_counts": True,
-            "unique_bidders": True,
-            "dollars_bid": True,
-            "highest_bid_placed": True,
-            "lat": False,
-            "long": False,
-            "marker_size":False
-        },
-        zoom=1.5,
-        mapbox_style="carto-positron"
-        # color_discrete_sequence=dfMap["marker_color"]
-    )
+    outputs = (text["refresh-time-map"], render_map_figure(view, search), text["active-bidder-count"], country_panel)
+    return outputs, encoded_size(outputs + (view.get("countries", {}),))
+
+
+def map_figure(points, center=None):
+    """Bubble map of a map view model's points (an empty map without points)"""
+    if not points:
+        fig = go.Figure(go.Scattermapbox(lat=[], lon=[], mode="markers"))
+        fig.update_layout(mapbox={"style": "carto-positron", "zoom": 2})
+        return fig
+
+    sizes = points["size"]
+    fig = go.Figure(go.Scattermapbox(
+        lat=points["lat"],
+        lon=points["lon"],
+        mode="markers",
+        hovertext=points["names"],
+        customdata=points["customdata"],
+        marker=dict(
+            size=sizes,
+            sizemode="area",
+            # Sizes run up to MAX_MARKER_SIZE, which is drawn MAX_MARKER_SIZE
+            # pixels across. Fixed rather than taken from max(sizes), so an
+            # all-equal render (every size MIN_MARKER_SIZE) has the same scale
+            # as the deltas applied to it later
+            sizeref=2.0 / MAX_MARKER_SIZE,
+            color=points["color"],
+            opacity=0.8
+        ),
+        hovertemplate="<b>%{customdata[0]}</b><br>" +
+                  "Bids: %{customdata[1]:,}<br>" +
+                  "Bidders: %{customdata[2]:,}<br>" 
+                #   "Dollars Bid: $%{customdata[3]:,}<br>" +
+                #   "Highest Bid: $%{customdata[4]:,}<extra></extra>"
+    ))
+    mapbox = {"style": "carto-positron", "zoom": 1.5}
+    if center:
+        mapbox["center"] = center
     fig.update_layout(
+        mapbox=mapbox,
         hovermode="closest",
         autosize=True,
         uirevision='static',
@@ -642,57 +654,210 @@ def update_map(n,pathname,prev_store):
         font={"color": "#111827"},
         coloraxis_showscale=False
     )
-    fig.update_traces(
-        marker=dict( color=dfMap["marker_color"],sizemode="area",  opacity=0.8), 
-        customdata=dfMap[[
-                "country_long_name",
-                "bid_counts",
-                "unique_bidders",
-                "dollars_bid",
-                "highest_bid_placed"
-            ]],
-        hovertemplate="<b>%{customdata[0]}</b><br>" +
-                  "Bids: %{customdata[1]:,}<br>" +
-                  "Bidders: %{customdata[2]:,}<br>" 
-                #   "Dollars Bid: $%{customdata[3]:,}<br>" +
-                #   "Highest Bid: $%{customdata[4]:,}<extra></extra>"
+    return fig
+
+
+def choropleth_figure(countries, names):
+    """Countries shaded by unique bidders over the bundled shapes (no map tiles)
 
+    The grey base layer is every shape; the bidders trace is drawn last so
+    the clientside delta applier can find it as the last trace.
+    """
+    hovertemplate = "<b>%{customdata[0]}</b><br>Bids: %{customdata[1]:,}<br>Bidders: %{customdata[2]:,}<extra></extra>"
+    base = go.Choropleth(
+        geojson=SHAPES_URL, featureidkey="properties.name",
+        locations=list(names), z=[0] * len(names),
+        colorscale=[[0, "#E9ECF1"], [1, "#E9ECF1"]], showscale=False,
+        marker_line_color="#ffffff", marker_line_width=0.5, hoverinfo="skip"
     )
-    # Initialize all countries to be shown in flash cards
-    # Add index for tracking order and set all to not displayed
-    for i, item in enumerate(new_store):
-        item["index"] = i
-        # Always set displayed to False to show all countries every time
-        item["displayed"] = False
-    
-    # Return data without flash card
-    return updated, fig, active_bidders, country_panel, new_store
+    located = list(countries)
+    bidders = go.Choropleth(
+        geojson=SHAPES_URL, featureidkey="properties.name",
+        locations=located, z=[countries[name][3] or 0 for name in located],
+        customdata=[[name] + countries[name][2:] for name in located],
+        colorscale=[[0, "#c8ecd4"], [1, "#00b050"]], showscale=False,
+        marker_line_color="#ffffff", marker_line_width=0.5,
+        hovertemplate=hovertemplate
+    )
+    fig = go.Figure([base, bidders])
+    # No base layers, so plotly.js doesn't fetch its own world topojson either
+    fig.update_geos(
+        projection_type="natural earth", lataxis_range=[-58, 85],
+        showframe=False, showcoastlines=False, showcountries=False, showland=False,
+        showocean=False, showlakes=False, showrivers=False, bgcolor="#ffffff"
+    )
+    fig.update_layout(
+        autosize=True,
+        uirevision='static',
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+        paper_bgcolor="#ffffff",
+        font={"color": "#111827"}
+    )
+    return fig
+
+
+def render_map_figure(view, search):
+    """Bubble map, or the choropleth when the screen asks for it and the shapes are built"""
+    names = shape_names() if map_mode(search) == "choropleth" else None
+    if names:
+        return choropleth_figure(view.get("countries") or {}, names)
+    return map_figure(view.get("points"), view.get("center"))
+
+
+def encoded_size(outputs):
+    """Bytes a full render sends, for comparison with delta updates"""
+    return len(json.dumps(outputs, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+# Delta updates: on each tick the server sends what changed since the version
+# the screen shows, and the clientside callbacks below patch it in place. A
+# {"full": true} reply bumps the resync counter, which re-runs the full render.
+# The same reply moves the screen's poll interval to the refresh policy's.
+def poll_snapshot(view, search, seen, interval):
+    region = resolve_region(search)
+    delta = build_delta(view, region, seen)
+    new_interval = client_interval_ms(get_sections(["refresh"], region=region).get("refresh"))
+    if new_interval == interval:
+        new_interval = None
+    if delta is None and new_interval is None:
+        raise PreventUpdate
+    return (
+        delta if delta is not None else dash.no_update,
+        new_interval if new_interval is not None else dash.no_update,
+    )
+
+
+@app.callback(
+    Output("map-delta", "data"),
+    Output("interval-map", "interval"),
+    Input("interval-map", "n_intervals"),
+    State("url", "pathname"),
+    State("url", "search"),
+    State("map-version", "data"),
+    State("interval-map", "interval"),
+    prevent_initial_call=True
+)
+def poll_map(n, pathname, search, seen, interval):
+    if pathname != "/map":
+        raise PreventUpdate
+    return poll_snapshot("map", search, seen, interval)
+
+
+app.clientside_callback(
+    """
+    function(delta, figure, model, resync, flashStore) {
+        const nu = window.dash_clientside.no_update;
+        if (!delta) {
+            return [nu, nu, nu, nu, nu, nu, nu, nu];
+        }
+        if (delta.full || !figure || !figure.data || !figure.data.length || !model || !Object.keys(model).length) {
+            return [nu, nu, nu, nu, nu, nu, nu, (resync || 0) + 1];
+        }
+
+        // model rows: [lat, long, bid_counts, unique_bidders, dollars_bid, highest_bid_placed]
+        const countries = Object.assign({}, model);
+        (delta.countries.remove || []).forEach(name => { delete countries[name]; });
+        Object.assign(countries, delta.countries.upsert || {});
+        const names = Object.keys(countries).sort((a, b) => (countries[b][3] || 0) - (countries[a][3] || 0));
+
+        // Same scaling and colours as the full render; the bidders trace is the last one
+        const last = figure.data.length - 1;
+        let trace;
+        if (figure.data[last].type === "choropleth") {
+            trace = Object.assign({}, figure.data[last], {
+                locations: names,
+                z: names.map(n => countries[n][3] || 0),
+                customdata: names.map(n => [n].concat(countries[n].slice(2)))
+            });
+        } else {
+            const onMap = names.filter(n => countries[n][0] != null && countries[n][1] != null && countries[n][2] != null);
+            const bidders = onMap.map(n => countries[n][3] || 0);
+            const minB = Math.min(...bidders), maxB = Math.max(...bidders);
+            trace = Object.assign({}, figure.data[last], {
+                lat: onMap.map(n => countries[n][0]),
+                lon: onMap.map(n => countries[n][1]),
+                hovertext: onMap,
+                customdata: onMap.map(n => [n].concat(countries[n].slice(2))),
+                // view_format.map_points sizes (2..25) on the fixed sizeref of map_figure
+                marker: Object.assign({}, figure.data[last].marker, {
+                    size: bidders.map(b => minB === maxB ? 2 : 2 + (b - minB) * 23 / (maxB - minB)),
+                    sizemode: "area",
+                    sizeref: 2 / 25,
+                    color: bidders.map(b => b > 0 ? "#00b050" : "#00ff00")
+                })
+            });
+        }
+        const newFigure = Object.assign({}, figure, {data: figure.data.slice(0, last).concat([trace])});
+
+        const span = (props) => ({type: "Span", namespace: "dash_html_components", props: props});
+        const panel = names.map(n => ({
+            type: "Div", namespace: "dash_html_components",
+            props: {className: "country-item", children: [
+                span({children: n}),
+                span({children: (countries[n][3] || 0).toLocaleString("en-US"), className: "bidder-count"})
+            ]}
+        }));
+
+        const previous = {};
+        (flashStore || []).forEach(item => { previous[item.country] = item.count; });
+        const store = names.map((n, i) => ({
+            country: n, count: countries[n][3], displayed: false,
+            changed: previous[n] !== countries[n][3], index: i
+        }));
+
+        const text = delta.text || {};
+        return [
+            newFigure, panel,
+            "active-bidder-count" in text ? text["active-bidder-count"] : nu,
+            "refresh-time-map" in text ? text["refresh-time-map"] : nu,
+            store, countries, {version: delta.version, region: delta.region}, nu
+        ];
+    }
+    """,
+    Output("auction-map", "figure", allow_duplicate=True),
+    Output("country-info-panel", "children", allow_duplicate=True),
+    Output("active-bidder-count", "children", allow_duplicate=True),
+    Output("refresh-time-map", "children", allow_duplicate=True),
+    Output("country-flash-store", "data", allow_duplicate=True),
+    Output("map-model", "data", allow_duplicate=True),
+    Output("map-version", "data", allow_duplicate=True),
+    Output("map-resync", "data"),
+    Input("map-delta", "data"),
+    State("auction-map", "figure"),
+    State("map-model", "data"),
+    State("map-resync", "data"),
+    State("country-flash-store", "data"),
+    prevent_initial_call=True
+)
 
-# Callback for flash card display
+# Callback for flash card display. The card follows the store only: each
+# flash tick marks a country displayed (mark_country_displayed), and that
+# store update brings the next card, so a tick costs one request here, not two.
+# The map page is the only one mounted with these components (render_page)
 @app.callback(
     Output("flash-card-container", "children"),
     Input("country-flash-store", "data"),
-    Input("flash-interval", "n_intervals"),
-    Input("url", "pathname"),
+    State("flash-interval", "n_intervals"),
     prevent_initial_call=False
 )
-def show_flash_card(store_data, n_intervals, pathname):
+def show_flash_card(store_data, n_intervals):
     """Show a flash card for the current country being displayed"""
     global current_flash_index
     
-    # Only proceed on map page with valid data
-    if pathname != "/map" or not store_data or len(store_data) == 0:
+    # Only proceed with valid data
+    if not store_data or len(store_data) == 0:
         return None
     
     # Debug info
-    logger.info(f"Flash interval triggered: n_intervals={n_intervals}")
+    logger.debug(f"Flash interval triggered: n_intervals={n_intervals}")
     
     # Count displayed vs total countries
     total_countries = len(store_data)
     displayed_countries = sum(1 for item in store_data if item.get("displayed", True))
     undisplayed_countries = total_countries - displayed_countries
     
-    logger.info(f"Countries - Total: {total_countries}, Displayed: {displayed_countries}, Undisplayed: {undisplayed_countries}")
+    logger.info(f"Countries - Total: {total_countries}, Displayed: {displayed_countries}, Undisplayed: {undisplayed_countries}",
+                extra={"sample": "flash_card"})
     
     # Find the first undisplayed country
     current_country = None
@@ -703,7 +868,7 @@ def show_flash_card(store_data, n_intervals, pathname):
     
     # If we have a country to display, create the flash card
     if current_country:
-        logger.info(f"Showing flash card for country: {current_country['country']} with {current_country['count']} bidders")
+        logger.debug(f"Showing flash card for country: {current_country['country']} with {current_country['count']} bidders")
         
         # Get a color gradient based on the country's region
         country_name = current_country["country"]
@@ -715,7 +880,7 @@ def show_flash_card(store_data, n_intervals, pathname):
             if country_name in data["countries"]:
                 background_gradient = data["gradient"]
                 region_name = region
-                logger.info(f"Using {region} color scheme for {country_name}")
+                logger.debug(f"Using {region} color scheme for {country_name}")
                 break
         
         # If no region found, use a random gradient
@@ -725,7 +890,7 @@ def show_flash_card(store_data, n_intervals, pathname):
             country_hash = int(hashlib.md5(country_name.encode()).hexdigest(), 16)
             random_index = country_hash % len(RANDOM_GRADIENTS)
             background_gradient = RANDOM_GRADIENTS[random_index]
-            logger.info(f"Using random color scheme for {country_name} (index {random_index})")
+            logger.debug(f"Using random color scheme for {country_name} (index {random_index})")
         
         # Create a custom style for the flash card with the selected gradient
         custom_style = {
@@ -759,27 +924,24 @@ def show_flash_card(store_data, n_intervals, pathname):
         return flash_card
     
     # No countries to display
-    logger.info("No more countries to display")
+    logger.info("No more countries to display", extra={"sample": "flash_card_done"})
     return None
 
-# Separate callback for managing the flash interval
-@app.callback(
+# Flash interval runs only while countries are left to show (it exists only
+# on the mounted map page). Decided in the browser, so store updates cost no
+# round trip
+app.clientside_callback(
+    """
+    function(storeData) {
+        if (!storeData || !storeData.length) {
+            return true;
+        }
+        return !storeData.some(item => item.displayed === false);
+    }
+    """,
     Output("flash-interval", "disabled"),
-    Input("country-flash-store", "data"),
-    Input("url", "pathname"),
-    prevent_initial_call=False
+    Input("country-flash-store", "data")
 )
-def manage_flash_interval(store_data, pathname):
-    """Control whether the flash interval is enabled based on undisplayed countries"""
-    # Only proceed on map page with valid data
-    if pathname != "/map" or not store_data or len(store_data) == 0:
-        return True
-    
-    # Check if we have any undisplayed countries
-    has_undisplayed = any(not item.get("displayed", True) for item in store_data)
-    
-    # Disable interval if no undisplayed countries
-    return not has_undisplayed
 
 # Shared state for tracking the current flash card
 current_flash_index = 0
@@ -838,15 +1000,14 @@ RANDOM_GRADIENTS = [
     Output("country-flash-store", "data", allow_duplicate=True),
     Input("flash-interval", "n_intervals"),
     State("country-flash-store", "data"),
-    State("url", "pathname"),
     prevent_initial_call=True
 )
-def mark_country_displayed(n_intervals, store_data, pathname):
+def mark_country_displayed(n_intervals, store_data):
     """Mark the current country as displayed when the interval triggers"""
     global current_flash_index
     
-    # Only proceed on map page with valid data
-    if pathname != "/map" or not store_data or len(store_data) == 0:
+    # Only proceed with valid data
+    if not store_data or len(store_data) == 0:
         raise dash.exceptions.PreventUpdate
     
     # Create a copy of the store
@@ -865,112 +1026,59 @@ def mark_country_displayed(n_intervals, store_data, pathname):
     
     # Log the update
     country_name = updated_store[index_to_mark]["country"]
-    logger.info(f"Marking country as displayed: {country_name} (index {index_to_mark})")
+    logger.debug(f"Marking country as displayed: {country_name} (index {index_to_mark})")
     
     # Increment the current flash index
     current_flash_index += 1
     
     return updated_store
 
-@app.callback(
-    Output('refresh-time-kpi', 'children'),
-    Output('kpi-section', 'children'),
-    Input('interval-refresh', 'n_intervals'),
-    Input("url", "pathname"),
-    prevent_initial_call=True
-)
-def update_kpi(n,pathname):
-    if pathname not in ["/",'/kpi']:
-        raise dash.exceptions.PreventUpdate
-    
-    kpi_data = get_cached_data()
-    data = kpi_data.get("kpis", {})
-    logger.info("Refreshing KPI view")
-    
-    summary = kpi_data.get("summary", {})
-    raw_ts = summary.get("last_up_date")    
-
-    if raw_ts:
-        try:
-            parsed_dt  = (
-                pd.to_datetime(raw_ts, utc=True)
-                # .tz_localize('UTC')
-                .astimezone(ZoneInfo("America/Chicago"))
-            )
-            now_date = parsed_dt.strftime("%b %d, %Y")
-            now_time = parsed_dt.strftime("%I:%M %p")
-        except Exception:
-            now_date = ""
-            now_time = ""
-    else:
-        now_date = ""
-        now_time = ""
+def kpi_tiles(text, period, tiles):
+    """KPI cards for one column of the KPI view, from the view model's tile text"""
+    cards = []
+    for tile in tiles:
+        green = tile.get("green", False)
+        card = kpi_card(
+            tile["title"], text.get(tile_id(tile["metric"], period), "-"),
+            is_currency=tile.get("currency", False),
+            show_icon=period == "today", icon=tile.get("icon"),
+            bg_color=GREEN_BG if green else GRAY_BG,
+            borderColor="#aed5b8" if green and period == "today" else "#cecfd4",
+            element_id=tile_id(tile["metric"], period),
+        )
+        if tile.get("wide"):
+            card = html.Div(card, style={"width": "97.5%","padding": "0","margin": "0"})
+        cards.append(card)
+    return cards
 
-    refresh_label = f"Last Updated: {now_date} | {now_time} "
+
+def kpi_render(view, region):
+    """Version-dependent outputs of the KPI view's full render, and their size in bytes"""
+    # Tile values and labels were formatted when the snapshot was published
+    text = {**kpi_labels({}), **view.get("text", {})}
+    refresh_label = text["refresh-time-kpi"]
 
     
-    return refresh_label, html.Div([
+    outputs = (refresh_label, html.Div([
 
     html.Div([
         html.Div([  # Row wrapper
             # LEFT COLUMN: Today's KPIs (2-wide cards)
             html.Div([
-                html.Div(f"SINCE 12:00:00 AM TODAY, {now_date}", style={"backgroundColor":"#005a99","marginBottom":"15px"}, className="text-white text-center fw-bold p-2 metricHeader rounded-top"),
-                html.Div([
-                    # kpi_card("Vehicles Sold", data["lots_sold"]["today"], show_icon=True, icon="/assets/img/vehiclessold.png"),
-                    kpi_card("Bids Received", data["bids_received"]["today"], show_icon=True, icon="/assets/img/bidsreceived.png",
-                            #  tooltip="Bids Received Today"
-                             ),
-                    kpi_card("Bidder Countries", data["bidder_countries"]["today"], show_icon=True,icon="/assets/img/biddercountries.png",
-                            #  tooltip="Bidder Countries"
-                             ),
-                    kpi_card("Unique Bidders", data["unique_bidders"]["today"], show_icon=True, icon="/assets/img/uniquebidders.png",
-                            #  tooltip="Unique Bidders"
-                             ),
-                    kpi_card("Auction Events Run", data["auction_events_run"]["today"], show_icon=True, icon="/assets/img/auctionevents.png",
-                            #  tooltip="Auction Events Run"
-                             ),
-                    kpi_card("Highest Bid Placed", data["highest_bid_placed"]["today"], show_icon=True, is_currency=True,bg_color=GREEN_BG, borderColor="#aed5b8", 
-                            icon="/assets/img/highestbid.png", 
-                            # tooltip="Highest Bid Placed"
-                            ),
-                    # kpi_card("Gross Value", data["gross_value_sold"]["today"], show_icon=True, is_currency=True,bg_color=GREEN_BG, borderColor="#aed5b8"
-                    #          ,icon="/assets/img/grossvalue.png",
-                    #            ),
-                    kpi_card("Transaction Value", data["net_value_sold"]["today"], show_icon=True, is_currency=True,bg_color=GREEN_BG, borderColor="#aed5b8"
-                             , icon="/assets/img/netvalue.png", 
-                             ),
-                     html.Div(kpi_card("Total Dollars Bid", data["dollars_bid"]["today"], show_icon=True, is_currency=True,bg_color=GREEN_BG, borderColor="#aed5b8"
-                             ,icon="/assets/img/totaldollars.png",
-                            #    tooltip="Total Dollars Bid"
-                               ),style={"width": "97.5%","padding": "0","margin": "0"})
-                    # html.Div(kpi_card("Total Dollars Bid", data["dollars_bid"]["today"], show_icon=True, is_currency=True,bg_color=GREEN_BG, borderColor="#aed5b8",icon="/assets/img/totaldollars.png"),
-                    #           style={"width": "97.5%","padding": "0","margin": "0"})
-                ], className="row row-cols-1 row-cols-md-2 g-3")
+                html.Div(text["kpi-since-label"], id="kpi-since-label", style={"backgroundColor":"#005a99","marginBottom":"15px"}, className="text-white text-center fw-bold p-2 metricHeader rounded-top"),
+                html.Div(kpi_tiles(text, "today", TODAY_TILES), className="row row-cols-1 row-cols-md-2 g-3")
             ], className="col-md-8 currentKPI"),
 
             # RIGHT COLUMN: Last Year KPIs
             html.Div([
                 html.Div("LAST 12 MONTHS", style={"backgroundColor":"#005a99"}, className="text-white text-center fw-bold p-2 metricHeader rounded-top"),
-                html.Div([
-                    # kpi_card("Vehicles Sold", data["lots_sold"]["ly"], show_icon=False),
-                    kpi_card("Unique Bidders", data["unique_bidders"]["ly"], show_icon=False,
-                            #   tooltip="Unique Bidders"
-                              ),
-                    kpi_card("Total Bids", data["bids_received"]["ly"], show_icon=False,
-                            #   tooltip="Total Bids"
-                              ),
-                    kpi_card("Transaction Value", data["net_value_sold"]["ly"], show_icon=False, is_currency=True,bg_color=GREEN_BG, 
-                             ),
-                    kpi_card("Dollars Bid", data["dollars_bid"]["ly"], show_icon=False, is_currency=True,bg_color=GREEN_BG)
-                    
-                ], className="lastYearMetricWrapper"),
+                html.Div(kpi_tiles(text, "ly", LY_TILES), className="lastYearMetricWrapper"),
                 html.Div([
                     html.Div([
-                         html.Span("Today's live data: US and Canada combined", className="text-success updateInfo"),
+                         html.Span(f"Today's live data: {region_label(region)}", className="text-success updateInfo"),
                     ], style={"marginLeft": "10%"}),
                     html.Div([
-                        html.Span(f" Last Updated: {now_date} | {now_time}", className="text-muted ms-2")
+                        html.Span(text["kpi-updated-label"], id="kpi-updated-label", className="text-muted ms-2")
                     ], style={"marginLeft": "9%"}),
                 ], className="mt-3 check-icon")
             ], className="col-md-4 lastYearKPI")
@@ -978,7 +1086,96 @@ def update_kpi(n,pathname):
         ], className="row")
     ]),
 
-], className="container-fluid p-4")
+], className="container-fluid p-4"))
+    return outputs, encoded_size(outputs)
+
+
+@app.callback(
+    Output('refresh-time-kpi', 'children'),
+    Output('kpi-section', 'children'),
+    Output('kpi-version', 'data'),
+    Input('kpi-resync', 'data'),
+    Input("url", "pathname"),
+    Input("url", "search")
+    # Runs when the KPI page mounts
+)
+def update_kpi(resync,pathname,search):
+    """Full render of the KPI view from its view model; later snapshots arrive as deltas"""
+    if pathname not in ["/",'/kpi']:
+        raise dash.exceptions.PreventUpdate
+    
+    region = resolve_region(search)
+    view, version = get_view("kpi", region)
+    logger.info("Refreshing KPI view", extra={"sample": "kpi_render"})
+
+    # Rendered once per snapshot version and region, shared by every screen
+    outputs, nbytes = cached_render("update_kpi", version, (region,), lambda: kpi_render(view, region))
+    record_send("kpi", "full_renders", nbytes)
+    return outputs + ({"version": version, "region": region},)
+
+
+@app.callback(
+    Output("kpi-delta", "data"),
+    Output("interval-refresh", "interval"),
+    Input("interval-refresh", "n_intervals"),
+    State("url", "pathname"),
+    State("url", "search"),
+    State("kpi-version", "data"),
+    State("interval-refresh", "interval"),
+    prevent_initial_call=True
+)
+def poll_kpi(n, pathname, search, seen, interval):
+    if pathname not in ["/", "/kpi"]:
+        raise PreventUpdate
+    return poll_snapshot("kpi", search, seen, interval)
+
+
+app.clientside_callback(
+    """
+    function(delta, tree, resync) {
+        const nu = window.dash_clientside.no_update;
+        if (!delta) {
+            return [nu, nu, nu, nu];
+        }
+        if (delta.full || !tree) {
+            return [nu, nu, nu, (resync || 0) + 1];
+        }
+
+        // Replace the text of every element whose id has a new value
+        const text = delta.text || {};
+        function patch(node) {
+            if (Array.isArray(node)) {
+                return node.map(patch);
+            }
+            if (!node || typeof node !== "object" || !node.props) {
+                return node;
+            }
+            const props = Object.assign({}, node.props);
+            if (props.id && Object.prototype.hasOwnProperty.call(text, props.id)) {
+                props.children = text[props.id];
+            } else if (props.children !== undefined) {
+                props.children = patch(props.children);
+            }
+            return Object.assign({}, node, {props: props});
+        }
+
+        return [
+            patch(tree),
+            "refresh-time-kpi" in text ? text["refresh-time-kpi"] : nu,
+            {version: delta.version, region: delta.region},
+            nu
+        ];
+    }
+    """,
+    Output("kpi-section", "children", allow_duplicate=True),
+    Output("refresh-time-kpi", "children", allow_duplicate=True),
+    Output("kpi-version", "data", allow_duplicate=True),
+    Output("kpi-resync", "data"),
+    Input("kpi-delta", "data"),
+    State("kpi-section", "children"),
+    State("kpi-resync", "data"),
+    prevent_initial_call=True
+)
 
 # ------------------------------------------------------------------------
 if __name__ == '__main__':
@@ -0,0 +1,44 @@
+import pandas as pd
+
+# Derive the kpis, grid and summary snapshot sections from one auction_stats
+# result (columns as returned by data_service.fetch_stats_columns).
+
+METRIC_MAP = {
+    "LOTS SOLD": "lots_sold",
+    "AUCTION EVENTS RUN": "auction_events_run",
+    "BIDDER COUNTRIES": "bidder_countries",
+    "GROSS VALUE SOLD": "gross_value_sold",
+    "NET VALUE SOLD": "net_value_sold",
+    "UNIQUE BIDDERS": "unique_bidders",
+    "BIDS RECEIVED": "bids_received",
+    "HIGHEST BID PLACED": "highest_bid_placed",
+    "DOLLARS BID": "dollars_bid"
+}
+
+def kpis_from_stats(cols):
+    result = {}
+    for metric, today, ly in zip(cols.get("metric", []), cols.get("value_today", []), cols.get("value_ly", [])):
+        key = METRIC_MAP.get(metric)
+        if key:
+            result[key] = {
+                "today": float(today or 0),
+                "ly": float(ly or 0)
+            }
+    return result
+
+def grid_from_stats(cols):
+    return {name: cols[name] for name in ("metric", "value_today", "value_ly") if name in cols}
+
+def summary_from_stats(cols):
+    """Same shape as fetch_bidder_summary()"""
+    bidders = 0
+    last_updated = None
+    for metric, today, ts in zip(cols.get("metric", []), cols.get("value_today", []), cols.get("last_updated_dt", [])):
+        if metric == "UNIQUE BIDDERS":
+            bidders += today or 0
+            if ts and (last_updated is None or ts > last_updated):
+                last_updated = ts
+    return {
+        "bidders": int(bidders),
+        "last_up_date": pd.Timestamp(last_updated).strftime("%Y-%b-%d %H:%M:%S") if last_updated else "N/A"
+    }
@@ -0,0 +1,137 @@
+"""Benchmark the BigQuery result -> snapshot JSON conversion.
+
+Compares the old pandas path (``to_dataframe()`` -> records ->
+``clean_decimals`` -> JSON) with the Arrow path used by ``data_service``
+(Arrow table -> ``arrow_to_columns`` -> JSON). Tables are synthesised in the
+shape BigQuery returns them (NUMERIC as decimal128, TIMESTAMP in UTC), so no
+credentials are needed:
+
+    python -m benchmarks.bench_fetch --repeat 50 --extra-cols 40
+
+Before timing, every NUMERIC value is checked to come out of the Arrow path
+as exactly ``float(Decimal)``, the value the pandas path wrote.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+
+from columnar import arrow_to_columns
+
+SNAPSHOT_PATH = os.path.join("cache", "auction_data.json")
+NUMERIC = pa.decimal128(38, 9)
+
+
+def clean_decimals(obj):
+    """The per-value walk refresh_data used before the Arrow path"""
+    if isinstance(obj, list):
+        return [clean_decimals(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: clean_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return obj
+
+
+def _decimal_array(values):
+    # Snapshot floats can carry more digits than NUMERIC's scale (a refresh
+    # may have written 29.000000000000004); round them to it like BigQuery
+    quantum = Decimal(1).scaleb(-NUMERIC.scale)
+    return pa.array([None if v is None else Decimal(str(v)).quantize(quantum) for v in values], type=NUMERIC)
+
+
+def _timestamp_array(values):
+    return pa.array(pd.to_datetime(pd.Series(values), utc=True), type=pa.timestamp("us", tz="UTC"))
+
+
+def stats_table(snapshot):
+    grid = pd.DataFrame(snapshot["grid"])
+    return pa.table({
+        "metric": pa.array(grid["metric"].tolist(), type=pa.string()),
+        "value_today": _decimal_array(grid["value_today"].tolist()),
+        "value_ly": _decimal_array(grid["value_ly"].tolist()),
+    })
+
+
+def country_table(snapshot, repeat, extra_cols):
+    rows = pd.DataFrame(snapshot["map"])
+    rows = pd.concat([rows] * repeat, ignore_index=True)
+    columns = {
+        "country_long_name": pa.array(rows["country_long_name"].tolist(), type=pa.string()),
+        "lat": pa.array(rows["lat"].astype(float).tolist(), type=pa.float64()),
+        "long": pa.array(rows["long"].astype(float).tolist(), type=pa.float64()),
+        "bid_counts": pa.array(rows["bid_counts"].astype(int).tolist(), type=pa.int64()),
+        "unique_bidders": pa.array(rows["unique_bidders"].astype(int).tolist(), type=pa.int64()),
+        "dollars_bid": _decimal_array(rows["dollars_bid"].tolist()),
+        "highest_bid_placed": _decimal_array(rows["highest_bid_placed"].tolist()),
+        "last_updated_dt": _timestamp_array(rows["last_updated_dt"].tolist()),
+    }
+    for i in range(extra_cols):
+        columns[f"metric_{i}"] = _decimal_array(rows["dollars_bid"].tolist())
+    return pa.table(columns)
+
+
+def pandas_path(table):
+    df = table.to_pandas()
+    return json.dumps(clean_decimals(df.to_dict(orient="records")))
+
+
+def arrow_path(table):
+    return json.dumps(arrow_to_columns(table))
+
+
+def check_exact(table, name):
+    """Fail if a NUMERIC column's Arrow-path floats differ from float(Decimal)"""
+    columns = arrow_to_columns(table)
+    for column, field in zip(table.columns, table.schema):
+        if not pa.types.is_decimal(field.type):
+            continue
+        expected = [None if v is None else float(v) for v in column.to_pylist()]
+        for row, (want, got) in enumerate(zip(expected, columns[field.name])):
+            if want != got:
+                raise SystemExit(f"{name}.{field.name}[{row}]: NUMERIC {column[row]} became {got!r}, expected {want!r}")
+
+
+def _time(fn, table, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        payload = fn(table)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(payload)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pandas and Arrow snapshot conversion")
+    parser.add_argument("--repeat", type=int, default=50, help="copies of the cached country rows (long table)")
+    parser.add_argument("--extra-cols", type=int, default=40, help="extra NUMERIC columns (wide table)")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with open(SNAPSHOT_PATH) as f:
+        snapshot = json.load(f)
+
+    cases = [
+        ("auction_stats", stats_table(snapshot)),
+        ("country (long)", country_table(snapshot, args.repeat, 0)),
+        ("country (wide+long)", country_table(snapshot, args.repeat, args.extra_cols)),
+    ]
+    print(f"{'table':<22} {'rows':>7} {'cols':>5} {'pandas ms':>10} {'arrow ms':>9} {'speedup':>8} {'pandas KB':>10} {'arrow KB':>9}")
+    for name, table in cases:
+        check_exact(table, name)
+    for name, table in cases:
+        pandas_ms, pandas_bytes = _time(pandas_path, table, args.runs)
+        arrow_ms, arrow_bytes = _time(arrow_path, table, args.runs)
+        print(f"{name:<22} {table.num_rows:>7} {table.num_columns:>5} {pandas_ms:>10.2f} {arrow_ms:>9.2f} "
+              f"{pandas_ms / arrow_ms if arrow_ms else 0:>7.1f}x {pandas_bytes / 1024:>10.1f} {arrow_bytes / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
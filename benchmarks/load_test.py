@@ -0,0 +1,543 @@
+"""Multi-screen load test for the dashboard.
+
+Replays the callback traffic a TV browser generates against
+``/_dash-update-component``: the initial page load, interval ticks
+(``interval-map``, ``interval-refresh``), the ``flash-interval`` country
+rotation and route navigation. Each simulated screen reads the app's real
+layout and callback graph, so the request mix follows whatever the app
+currently wires up.
+
+Usage (from the repo root):
+
+    python -m benchmarks.load_test --screens 1,5,10,25 --duration 60 --time-scale 30
+
+By default a local copy of the app is started with stand-in data from
+``cache/auction_data.json``; pass ``--url`` to target an already running app
+(add ``--server-pid`` to still collect CPU/RSS).
+"""
+import argparse
+import copy
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 8765
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Clientside callbacks never reach the server, but a screen still has to see
+# their outputs to send the same follow-up requests a browser would. Map the
+# callback's outputs (any one "id.prop" of them) to a python function taking
+# the input and state values and returning the output values (None for
+# no_update).
+def _emulate_map_delta(delta, figure, model, resync, flash_store):
+    if not delta:
+        return None
+    if delta.get("full") or not figure or not model:
+        return [None] * 7 + [(resync or 0) + 1]
+    countries = dict(model)
+    for name in delta["countries"].get("remove", []):
+        countries.pop(name, None)
+    countries.update(delta["countries"].get("upsert", {}))
+    names = sorted(countries, key=lambda n: countries[n][3] or 0, reverse=True)
+    previous = {item["country"]: item["count"] for item in flash_store or []}
+    store = [{"country": n, "count": countries[n][3], "displayed": False,
+              "changed": previous.get(n) != countries[n][3], "index": i}
+             for i, n in enumerate(names)]
+    return [None, None, None, None, store, countries,
+            {"version": delta["version"], "region": delta["region"]}, None]
+
+
+def _emulate_kpi_delta(delta, tree, resync):
+    if not delta:
+        return None
+    if delta.get("full") or not tree:
+        return [None, None, None, (resync or 0) + 1]
+    return [None, None, {"version": delta["version"], "region": delta["region"]}, None]
+
+
+def _emulate_flash_interval(store_data):
+    if not store_data:
+        return True
+    return not any(item.get("displayed") is False for item in store_data)
+
+
+CLIENTSIDE_EMULATION = {
+    "map-resync.data": _emulate_map_delta,
+    "kpi-resync.data": _emulate_kpi_delta,
+    "flash-interval.disabled": _emulate_flash_interval,
+}
+
+
+# ------------------------------------------------------------------------
+# Local app under test
+
+def serve(port, replay_dir=None, replay_speed=1.0):
+    """Run the dashboard with stand-in data (child process entry point)
+
+    With ``replay_dir`` an archived day is replayed into the cache tiers
+    while the screens run, instead of one static snapshot.
+    """
+    from benchmarks import standin_data
+    standin_data.install()
+
+    import logging
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    import auction_dashboard
+    if replay_dir:
+        from snapshot_archive import Replay
+        Replay(replay_dir, speed=replay_speed, loop=True).start()
+    auction_dashboard.server.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def start_server(port, replay_dir=None, replay_speed=1.0):
+    command = [sys.executable, "-m", "benchmarks.load_test", "--serve", "--port", str(port)]
+    if replay_dir:
+        command += ["--replay", replay_dir, "--replay-speed", str(replay_speed)]
+    proc = subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Dashboard process exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Dashboard did not become healthy within 60s")
+
+
+# ------------------------------------------------------------------------
+# Server process stats (Linux /proc, no extra dependencies)
+
+def _cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of the full line
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def _rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class ProcessSampler(threading.Thread):
+    """Samples RSS once a second and CPU time at start/stop"""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak_rss = 0.0
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                self.peak_rss = max(self.peak_rss, _rss_mb(self.pid))
+            except OSError:
+                return
+            self._halt.wait(1)
+
+    def start(self):
+        self.cpu_start = _cpu_seconds(self.pid)
+        self.wall_start = time.time()
+        super().start()
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+        wall = time.time() - self.wall_start
+        cpu = _cpu_seconds(self.pid) - self.cpu_start
+        return {"cpu_pct": 100 * cpu / wall if wall else 0.0, "rss_mb": self.peak_rss}
+
+
+# ------------------------------------------------------------------------
+# Simulated screen
+
+def _parse_outputs(output):
+    if output.startswith(".."):
+        parts = output[2:-2].split("...")
+    else:
+        parts = [output]
+    return [tuple(p.rsplit(".", 1)) for p in parts]
+
+
+def _walk_layout(node, props):
+    """Collect the props of every component with an id"""
+    if isinstance(node, list):
+        for child in node:
+            _walk_layout(child, props)
+        return
+    if not isinstance(node, dict) or "props" not in node:
+        return
+    node_props = node["props"]
+    comp_id = node_props.get("id")
+    if isinstance(comp_id, str):
+        props[comp_id] = {"__type": node.get("type")}
+        for name, value in node_props.items():
+            if name != "children":
+                props[comp_id][name] = value
+        props[comp_id]["children"] = node_props.get("children")
+    _walk_layout(node_props.get("children"), props)
+
+
+class Screen(threading.Thread):
+    """One browser tab showing a single dashboard route"""
+
+    def __init__(self, base_url, routes, layout, dependencies, recorder, stop_at,
+                 time_scale=1.0, nav_every=None, seed=None):
+        super().__init__(daemon=True)
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.prefix = parsed.path.rstrip("/")
+        self.routes = routes
+        self.route_index = 0
+        self.layout = layout
+        self.dependencies = dependencies
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.time_scale = time_scale
+        self.nav_every = nav_every
+        self.rng = random.Random(seed)
+        self.conn = None
+        self.props = {}
+        self.timers = {}
+
+    # -- http -------------------------------------------------------------
+    def _request(self, method, path, label, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            started = time.perf_counter()
+            try:
+                self.conn.request(method, self.prefix + path, body=payload, headers=headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    self.recorder.record(label, (time.perf_counter() - started) * 1000, 0, 0)
+                    return None, None
+                continue
+            self.recorder.record(label, (time.perf_counter() - started) * 1000, resp.status, len(data))
+            return resp.status, data
+        return None, None
+
+    # -- dash client ------------------------------------------------------
+    def _value(self, dep):
+        return self.props.get(dep["id"], {}).get(dep["property"])
+
+    def _has_inputs(self, cb):
+        """Whether the callback's inputs and outputs are all mounted (Dash skips it otherwise)"""
+        return (all(dep["id"] in self.props for dep in cb["inputs"])
+                and all(comp_id in self.props for comp_id, _ in _parse_outputs(cb["output"])))
+
+    def _apply(self, comp_id, prop, value, changed):
+        prop = prop.split("@")[0]
+        if comp_id not in self.props:
+            self.props[comp_id] = {}
+        unmounted = {}
+        if prop == "children":
+            _walk_layout(self.props[comp_id].get("children"), unmounted)
+        self.props[comp_id][prop] = value
+        changed.add((comp_id, prop))
+        if prop == "children":
+            mounted = {}
+            _walk_layout(value, mounted)
+            # Replaced children leave the page along with their timers, as in a browser
+            for old_id in unmounted.keys() - mounted.keys():
+                self.props.pop(old_id, None)
+                self.timers.pop(old_id, None)
+            for new_id, new_props in mounted.items():
+                if new_id not in self.props:
+                    changed.add((new_id, "__mounted"))
+                self.props[new_id] = new_props
+
+    def _call(self, cb, changed_ids):
+        outputs = _parse_outputs(cb["output"])
+        if cb.get("clientside_function"):
+            emulate = next((CLIENTSIDE_EMULATION[f"{i}.{p.split('@')[0]}"] for i, p in outputs
+                            if f"{i}.{p.split('@')[0]}" in CLIENTSIDE_EMULATION), None)
+            if not emulate:
+                return set()
+            values = emulate(*[self._value(dep) for dep in cb["inputs"]],
+                             *[self._value(dep) for dep in cb.get("state", [])])
+            changed = set()
+            if values is not None:
+                for (comp_id, prop), value in zip(outputs, values if len(outputs) > 1 else [values]):
+                    if value is not None:
+                        self._apply(comp_id, prop, value, changed)
+            return changed
+
+        output_specs = [{"id": i, "property": p} for i, p in outputs]
+        body = {
+            "output": cb["output"],
+            "outputs": output_specs if len(output_specs) > 1 else output_specs[0],
+            "inputs": [dict(dep, value=self._value(dep)) for dep in cb["inputs"]],
+            "changedPropIds": [f"{i}.{p}" for i, p in changed_ids],
+            "state": [dict(dep, value=self._value(dep)) for dep in cb.get("state", [])],
+        }
+        label = outputs[0][0]
+        status, data = self._request("POST", "/_dash-update-component", label, body)
+        changed = set()
+        if status != 200 or not data:
+            return changed
+        response = json.loads(data).get("response", {})
+        for comp_id, prop_values in response.items():
+            for prop, value in prop_values.items():
+                self._apply(comp_id, prop, value, changed)
+        return changed
+
+    def _dispatch(self, changed, initial=False):
+        """Fire callbacks for changed props until the graph settles"""
+        pending = set(changed)
+        rounds = 0
+        while pending and rounds < 20:
+            rounds += 1
+            mounted = {comp_id for comp_id, prop in pending if prop == "__mounted"}
+            to_fire = []
+            for cb in self.dependencies:
+                if not self._has_inputs(cb):
+                    continue
+                inputs = {(dep["id"], dep["property"]) for dep in cb["inputs"]}
+                hit = inputs & pending
+                fresh = not cb.get("prevent_initial_call") and (
+                    initial or any(dep["id"] in mounted for dep in cb["inputs"]))
+                if hit or fresh:
+                    to_fire.append((cb, hit))
+            initial = False
+            pending = set()
+            for cb, hit in to_fire:
+                pending |= self._call(cb, hit)
+            self._sync_timers()
+
+    def _sync_timers(self):
+        now = time.time()
+        for comp_id, comp in self.props.items():
+            if comp.get("__type") != "Interval":
+                continue
+            if comp.get("disabled") or comp.get("max_intervals") == comp.get("n_intervals"):
+                self.timers.pop(comp_id, None)
+            elif comp_id not in self.timers:
+                period = comp.get("interval", 1000) / 1000 / self.time_scale
+                self.timers[comp_id] = now + period
+
+    def _load_page(self, route):
+        self.props = {}
+        self.timers = {}
+        self._request("GET", route, "page-load")
+        self._request("GET", "/_dash-layout", "page-load")
+        self._request("GET", "/_dash-dependencies", "page-load")
+        _walk_layout(copy.deepcopy(self.layout), self.props)
+        self.props.setdefault("url", {})["pathname"] = route
+        self._dispatch({("url", "pathname")}, initial=True)
+
+    def _navigate(self):
+        self.route_index = (self.route_index + 1) % len(self.routes)
+        self.props["url"]["pathname"] = self.routes[self.route_index]
+        self._dispatch({("url", "pathname")})
+
+    def run(self):
+        # Stagger start-up so screens don't tick in lockstep
+        time.sleep(self.rng.uniform(0, 1))
+        self.route_index = self.rng.randrange(len(self.routes))
+        self._load_page(self.routes[self.route_index])
+        next_nav = time.time() + self.nav_every / self.time_scale if self.nav_every else None
+
+        while time.time() < self.stop_at:
+            events = list(self.timers.items())
+            if next_nav:
+                events.append(("__nav", next_nav))
+            if not events:
+                time.sleep(min(1.0, max(0.0, self.stop_at - time.time())))
+                continue
+            comp_id, when = min(events, key=lambda e: e[1])
+            delay = when - time.time()
+            if delay > 0:
+                time.sleep(min(delay, max(0.0, self.stop_at - time.time())))
+                if time.time() < when:
+                    continue
+            if comp_id == "__nav":
+                self._navigate()
+                next_nav = time.time() + self.nav_every / self.time_scale
+                continue
+            comp = self.props[comp_id]
+            comp["n_intervals"] = (comp.get("n_intervals") or 0) + 1
+            self.timers.pop(comp_id, None)
+            self._dispatch({(comp_id, "n_intervals")})
+            self._sync_timers()
+        if self.conn:
+            self.conn.close()
+
+
+# ------------------------------------------------------------------------
+# Results
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def record(self, label, latency_ms, status, size):
+        with self.lock:
+            self.samples.append((label, latency_ms, status, size))
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarise(samples, wall_seconds):
+    latencies = sorted(s[1] for s in samples)
+    errors = sum(1 for s in samples if s[2] == 0 or s[2] >= 500)
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "errors": errors,
+        "kb_out": sum(s[3] for s in samples) / 1024,
+    }
+
+
+def per_label(samples):
+    labels = {}
+    for label, latency, status, size in samples:
+        labels.setdefault(label, []).append(latency)
+    return {
+        label: {"requests": len(v), "p50_ms": _percentile(sorted(v), 50), "p95_ms": _percentile(sorted(v), 95)}
+        for label, v in sorted(labels.items())
+    }
+
+
+def run_level(base_url, n_screens, args, layout, dependencies, server_pid):
+    recorder = Recorder()
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    started = time.time()
+    stop_at = started + args.duration
+    screens = [
+        Screen(base_url, args.routes, layout, dependencies, recorder, stop_at,
+               time_scale=args.time_scale, nav_every=args.nav_every, seed=i)
+        for i in range(n_screens)
+    ]
+    if sampler:
+        sampler.start()
+    for screen in screens:
+        screen.start()
+    for screen in screens:
+        screen.join(args.duration + 60)
+    wall = time.time() - started
+    stats = summarise(recorder.samples, wall)
+    stats["screens"] = n_screens
+    stats["req_per_screen_hour"] = stats["requests"] / n_screens * 3600 * args.time_scale / wall
+    stats.update(sampler.stop() if sampler else {"cpu_pct": None, "rss_mb": None})
+    stats["callbacks"] = per_label(recorder.samples)
+    return stats
+
+
+def _fetch_json(base_url, path):
+    parsed = urlparse(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    conn.request("GET", parsed.path.rstrip("/") + path)
+    return json.loads(conn.getresponse().read())
+
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(results, show_callbacks=False):
+    header = f"{'screens':>7} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+             f"{'err':>5} {'req/scr/h':>10} {'cpu %':>7} {'rss MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['screens']:>7} {r['requests']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>5} {r['req_per_screen_hour']:>10.0f} "
+              f"{_fmt(r['cpu_pct'], '>7.1f')} {_fmt(r['rss_mb'], '>7.1f')}")
+        if show_callbacks:
+            for label, c in r["callbacks"].items():
+                print(f"{'':>9}{label:<28} {c['requests']:>7} p50 {c['p50_ms']:>7.1f} p95 {c['p95_ms']:>7.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate N dashboard screens and report server load")
+    parser.add_argument("--screens", default="1,5,10,25", help="comma separated screen counts to step through")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run each step")
+    parser.add_argument("--routes", default="/map,/kpi", help="routes the screens are spread across")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="speed up interval timers by this factor (30 = 15 min refresh every 30s)")
+    parser.add_argument("--nav-every", type=float, default=None,
+                        help="seconds (unscaled) between route changes per screen; off by default")
+    parser.add_argument("--url", default=None, help="target a running app instead of starting one")
+    parser.add_argument("--server-pid", type=int, default=None, help="pid to sample CPU/RSS from with --url")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--per-callback", action="store_true", help="print a latency breakdown per callback")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    parser.add_argument("--replay", default=None, help="replay this snapshot archive (snapshot_archive.py) during the run")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="replay speed multiple")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.port, args.replay, args.replay_speed)
+        return
+
+    args.routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    levels = [int(n) for n in args.screens.split(",")]
+
+    proc = None
+    if args.url:
+        base_url = args.url
+        server_pid = args.server_pid
+    else:
+        print(f"🚀 Starting dashboard with stand-in data on port {args.port}...")
+        proc = start_server(args.port, args.replay, args.replay_speed)
+        base_url = f"http://127.0.0.1:{args.port}"
+        server_pid = proc.pid
+
+    try:
+        layout = _fetch_json(base_url, "/_dash-layout")
+        dependencies = _fetch_json(base_url, "/_dash-dependencies")
+        results = []
+        for n in levels:
+            print(f"📺 Running {n} screen(s) for {args.duration:.0f}s...")
+            results.append(run_level(base_url, n, args, layout, dependencies, server_pid))
+        print()
+        print_report(results, show_callbacks=args.per_callback)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(10)
+
+
+if __name__ == "__main__":
+    main()
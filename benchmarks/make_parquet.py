@@ -0,0 +1,111 @@
+"""Write a local Parquet dataset for the DuckDB backend (data_backends.py).
+
+Seeds ``auction_stats`` and ``auction_stats_cntry`` from a cached snapshot,
+typed the way BigQuery returns them (NUMERIC as decimal128, TIMESTAMP in UTC),
+and scales the country table up with ``--copies`` so the refresh -> cache ->
+render pipeline can be run at production-like volumes without credentials:
+
+    python -m benchmarks.make_parquet data/parquet --copies 50 --files 4
+    DATA_BACKEND=duckdb DUCKDB_PARQUET_DIR=data/parquet python auction_dashboard.py
+
+With REGION_COLUMN configured every table gets one copy of its rows per
+configured region value.
+"""
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.bench_fetch import SNAPSHOT_PATH, _decimal_array, _timestamp_array
+from regions import REGION_COLUMN, REGIONS
+
+
+def _region_values():
+    values = [region["value"] for region in REGIONS.values() if region.get("value") is not None]
+    return values or [None]
+
+
+def stats_table(snapshot, updated_at):
+    grid = pd.DataFrame(snapshot["grid"])
+    frames = []
+    for value in _region_values():
+        frame = grid.assign(last_updated_dt=updated_at)
+        if REGION_COLUMN:
+            frame[REGION_COLUMN] = value
+        frames.append(frame)
+    rows = pd.concat(frames, ignore_index=True)
+    columns = {
+        "metric": pa.array(rows["metric"].tolist(), type=pa.string()),
+        "value_today": _decimal_array(rows["value_today"].tolist()),
+        "value_ly": _decimal_array(rows["value_ly"].tolist()),
+        "last_updated_dt": _timestamp_array(rows["last_updated_dt"].tolist()),
+    }
+    if REGION_COLUMN:
+        columns[REGION_COLUMN] = pa.array(rows[REGION_COLUMN].tolist(), type=pa.string())
+    return pa.table(columns)
+
+
+def country_table(snapshot, copies, updated_at):
+    countries = pd.DataFrame(snapshot["map"])
+    frames = []
+    for value in _region_values():
+        for copy in range(copies):
+            frame = countries.assign(last_updated_dt=updated_at)
+            if copy:
+                # Extra copies get their own names so they stay distinct rows
+                frame["country_long_name"] = frame["country_long_name"] + f" #{copy}"
+            if REGION_COLUMN:
+                frame[REGION_COLUMN] = value
+            frames.append(frame)
+    rows = pd.concat(frames, ignore_index=True)
+    columns = {
+        "country_long_name": pa.array(rows["country_long_name"].tolist(), type=pa.string()),
+        "lat": pa.array(rows["lat"].astype(float).tolist(), type=pa.float64()),
+        "long": pa.array(rows["long"].astype(float).tolist(), type=pa.float64()),
+        "bid_counts": pa.array(rows["bid_counts"].astype(int).tolist(), type=pa.int64()),
+        "unique_bidders": pa.array(rows["unique_bidders"].astype(int).tolist(), type=pa.int64()),
+        "dollars_bid": _decimal_array(rows["dollars_bid"].tolist()),
+        "highest_bid_placed": _decimal_array(rows["highest_bid_placed"].tolist()),
+        "last_updated_dt": _timestamp_array(rows["last_updated_dt"].tolist()),
+    }
+    if REGION_COLUMN:
+        columns[REGION_COLUMN] = pa.array(rows[REGION_COLUMN].tolist(), type=pa.string())
+    return pa.table(columns)
+
+
+def write_table(table, directory, files):
+    """Write ``table`` as ``files`` Parquet parts into ``directory``"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".parquet"):
+            os.remove(os.path.join(directory, name))
+    size = -(-table.num_rows // files) if table.num_rows else 0
+    for part in range(files):
+        pq.write_table(table.slice(part * size, size), os.path.join(directory, f"part-{part:04d}.parquet"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a Parquet dataset for DATA_BACKEND=duckdb")
+    parser.add_argument("out_dir", help="directory to write auction_stats/ and auction_stats_cntry/ into")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="cached snapshot to seed rows from")
+    parser.add_argument("--copies", type=int, default=1, help="copies of the cached country rows")
+    parser.add_argument("--files", type=int, default=1, help="Parquet files per table")
+    args = parser.parse_args(argv)
+
+    with open(args.snapshot) as f:
+        snapshot = json.load(f)
+    updated_at = pd.Timestamp.now(tz="UTC")
+
+    for name, table in (
+        ("auction_stats", stats_table(snapshot, updated_at)),
+        ("auction_stats_cntry", country_table(snapshot, max(args.copies, 1), updated_at)),
+    ):
+        write_table(table, os.path.join(args.out_dir, name), max(args.files, 1))
+        print(f"{name:<22} {table.num_rows:>8} rows -> {os.path.join(args.out_dir, name)}")
+
+
+if __name__ == "__main__":
+    main()
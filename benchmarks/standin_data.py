@@ -0,0 +1,73 @@
+"""Stand-in for data_service that serves a saved snapshot instead of BigQuery.
+
+Used by the load-test harness so the dashboard can be started locally without
+credentials or network access. Install it with ``install()`` before importing
+``auction_dashboard``.
+"""
+import json
+import os
+import sys
+import types
+
+import pandas as pd
+
+SNAPSHOT_PATH = os.environ.get("STANDIN_SNAPSHOT", os.path.join("cache", "auction_data.json"))
+
+
+def _load_snapshot(path=SNAPSHOT_PATH):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _build_module(snapshot):
+    module = types.ModuleType("data_service")
+    module.__file__ = __file__
+
+    def fetch_stats_columns(region_values=None, dataset=None):
+        grid = pd.DataFrame(snapshot.get("grid", []))
+        if "last_updated_dt" not in grid.columns:
+            grid["last_updated_dt"] = snapshot.get("summary", {}).get("last_up_date")
+        return grid.to_dict(orient="list")
+
+    def fetch_kpis():
+        return dict(snapshot.get("kpis", {}))
+
+    def fetch_grid_columns():
+        return pd.DataFrame(snapshot.get("grid", [])).to_dict(orient="list")
+
+    def fetch_map_columns(region_values=None):
+        return pd.DataFrame(snapshot.get("map", [])).to_dict(orient="list")
+
+    def fetch_map_columns_since(watermark, region_values=None):
+        # The stand-in snapshot never changes, so there is nothing newer
+        return {}
+
+    def fetch_grid():
+        return pd.DataFrame(snapshot.get("grid", []))
+
+    def fetch_map_data():
+        return pd.DataFrame(snapshot.get("map", []))
+
+    def fetch_bidder_summary():
+        return dict(snapshot.get("summary", {"bidders": 0, "last_up_date": "N/A"}))
+
+    # One column group holding every column; the snapshot never changes
+    module.STATS_DATASETS = {"stats_today": {"columns": (), "ttl": 60}}
+    module.STATS_KEY = ("metric",)
+    module.fetch_stats_columns = fetch_stats_columns
+    module.fetch_kpis = fetch_kpis
+    module.fetch_grid_columns = fetch_grid_columns
+    module.fetch_map_columns = fetch_map_columns
+    module.fetch_map_columns_since = fetch_map_columns_since
+    module.fetch_grid = fetch_grid
+    module.fetch_map_data = fetch_map_data
+    module.fetch_bidder_summary = fetch_bidder_summary
+    module.fetch_grid_safe = fetch_grid
+    module.fetch_map_data_safe = fetch_map_data
+    module.fetch_bidder_summary_safe = fetch_bidder_summary
+    return module
+
+
+def install(path=SNAPSHOT_PATH):
+    """Register the stand-in as ``data_service`` in ``sys.modules``"""
+    sys.modules["data_service"] = _build_module(_load_snapshot(path))
@@ -1,127 +1,274 @@
-from data_service import fetch_kpis,fetch_grid, fetch_map_data, fetch_bidder_summary
+from data_service import fetch_stats_columns, fetch_map_columns, fetch_map_columns_since, STATS_DATASETS, STATS_KEY
+from auction_metrics import kpis_from_stats, grid_from_stats, summary_from_stats
+from regions import REGIONS, region_values, split_by_region
+from columnar import column_rows, merge_columns
+from config import CONFIG
+import hashlib
 import json
-import os
-from decimal import Decimal
-import pandas as pd
+import time
 from datetime import datetime
 import logging
-from redis import Redis
-import yaml
-import sys
+from redis_client import get_redis, set_many
+from snapshot_cache import get_sections, publish
+from snapshot_archive import archive_snapshots
+from kpi_history import record_kpis
+from refresh_policy import after_refresh
+from view_format import build_views
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.DEBUG)
 
 # Redis connection
 # redis_conn = Redis(host=os.getenv('REDIS_HOST', 'c-redis-dev4.copart.com'), port=int(os.getenv('REDIS_PORT', 6379)),password=os.getenv("REDIS_PASSWORD"))
 # redis_url = os.getenv("RQ_REDIS_URL", "redis://c-redis-dev4.copart.com:6379/0")
 
-config_path = os.path.join("config", "redis_config.yml")
-try:
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-except FileNotFoundError:
-    logger.error(f"❌ Config file not found: {config_path}")
-    sys.exit(1)
-except yaml.YAMLError as e:
-    logger.error(f"❌ Failed to parse YAML config: {e}")
-    sys.exit(1)
+# The snapshot is a Redis hash: one JSON-encoded field per section, so a view
+# only fetches and decodes the sections it renders (see snapshot_cache).
 
-if "redis" not in config:
-    logger.error("❌ Missing 'redis' section in config file")
-    sys.exit(1)
+# Last result of each auction_stats column group, kept for its TTL
+DATASET_KEY = "auction_dataset"
 
-redis_cfg = config["redis"]
+# Fields that describe the refresh rather than the data; left out of the version
+VERSION_EXCLUDED = ("version", "last_refreshed", "map_sync", "refresh", "view_kpi", "view_map")
 
-required_keys = ["host", "port", "db", "password", "client_name"]
-for key in required_keys:
-    if key not in redis_cfg:
-        logger.error(f"❌ Missing required key '{key}' in redis config")
-        sys.exit(1)
 
-password = os.getenv("REDIS_PASSWORD", redis_cfg.get("password"))
+def snapshot_version(data):
+    """Content hash of the data sections; unchanged data keeps its version"""
+    content = {k: v for k, v in data.items() if k not in VERSION_EXCLUDED}
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()[:12]
 
-# Redis connection
-redis_conn = Redis(
-    host=redis_cfg["host"],
-    port=redis_cfg["port"],
-    db=redis_cfg.get("db", 0),
-    password=password,
-    socket_timeout=redis_cfg.get("socket_timeout", 5),
-    socket_connect_timeout=redis_cfg.get("socket_connect_timeout", 5),
-    retry_on_timeout=redis_cfg.get("retry_on_timeout", True),
-    client_name=redis_cfg.get("client_name", "cache-data"),
-)
-
-def clean_decimals(obj):
-    if isinstance(obj, list):
-        return [clean_decimals(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: clean_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat()  # or str(obj)
-    return obj
+
+def build_country_rank(map_columns):
+    """[country, unique_bidders] pairs, most bidders first, for the info panel"""
+    names = map_columns.get("country_long_name") or []
+    counts = map_columns.get("unique_bidders") or []
+    rank = [[name, int(count or 0)] for name, count in zip(names, counts) if name]
+    rank.sort(key=lambda row: row[1], reverse=True)
+    return rank
+
+
+def read_previous_snapshots():
+    """Last published data of every region, kept when a source is unavailable"""
+    return {region: get_sections(["kpis", "grid", "summary", "map", "map_sync"], region=region) for region in REGIONS}
+
+def _full_map_due(previous, now):
+    prev_map = previous.get("map")
+    sync = previous.get("map_sync") or {}
+    return (
+        not CONFIG.get("MAP_INCREMENTAL")
+        or not sync.get("watermark")
+        or not isinstance(prev_map, dict)
+        or not column_rows(prev_map)
+        or now - sync.get("full_at", 0) >= CONFIG.get("MAP_FULL_RECONCILE_SECONDS", 3600)
+    )
+
+def plan_map_refresh(previous_by_region):
+    """(full, watermark) for this cycle: re-select every country, or fetch rows after watermark
+
+    All regions share one query; the oldest region watermark is used so no
+    region misses an update.
+    """
+    now = time.time()
+    if any(_full_map_due(previous, now) for previous in previous_by_region.values()):
+        return True, None
+    return False, min(p["map_sync"]["watermark"] for p in previous_by_region.values())
+
+def merge_map_refresh(previous_by_region, fetched, full):
+    """Return {region: (map columns, sync state)} from the rows fetched this cycle
+
+    Incremental rows are upserted into the previous country set; a full
+    re-select replaces it, which drops deleted countries. ``fetched`` is None
+    when the source was unavailable, in which case the last good map is kept.
+    """
+    if fetched is None:
+        # Source failing or breaker open: keep the last good map and watermark
+        logger.warning("⚠️ Country data unavailable; keeping the last good map")
+        return {
+            region: (
+                previous.get("map") if isinstance(previous.get("map"), dict) else {},
+                previous.get("map_sync") or {"mode": "unavailable", "full_at": 0, "watermark": None, "rows_fetched": 0},
+            )
+            for region, previous in previous_by_region.items()
+        }
+    fetched = split_by_region(fetched)
+
+    now = time.time()
+    result = {}
+    for region, previous in previous_by_region.items():
+        changes = fetched.get(region, {})
+        if full:
+            columns = changes
+            sync = {"mode": "full", "full_at": now}
+        else:
+            columns = merge_columns(previous["map"], changes, key="country_long_name")
+            sync = {"mode": "incremental", "full_at": previous["map_sync"]["full_at"]}
+
+        timestamps = [ts for ts in columns.get("last_updated_dt", []) if ts]
+        sync["watermark"] = max(timestamps) if timestamps else None
+        sync["rows_fetched"] = column_rows(changes)
+        logger.info(f"🗺 Map refresh {region} ({sync['mode']}): {sync['rows_fetched']} rows fetched, "
+                    f"{column_rows(columns)} countries cached")
+        result[region] = (columns, sync)
+    return result
+
+def refresh_map(previous_by_region):
+    """Return ({region: (map columns, sync state)} for this cycle, queries run)
+
+    Between full reconciliations only rows with last_updated_dt after the
+    previous watermark are fetched (see plan_map_refresh/merge_map_refresh).
+    """
+    full, watermark = plan_map_refresh(previous_by_region)
+    if full:
+        fetched = fetch_map_columns(region_values())
+    else:
+        fetched = fetch_map_columns_since(watermark, region_values())
+    return merge_map_refresh(previous_by_region, fetched, full), int(fetched is not None)
+
+def build_snapshots(previous, maps, stats_columns):
+    """{region: snapshot} from this cycle's map and auction_stats results
+
+    ``stats_columns`` is None (or empty) when auction_stats was unavailable;
+    each region then keeps its last good KPIs, grid and summary.
+    """
+    stats = split_by_region(stats_columns) if stats_columns else None
+    if stats is None:
+        logger.warning("⚠️ auction_stats unavailable; keeping the last good KPIs, grid and summary")
+    last_refreshed = datetime.now().strftime("%Y-%m-%d %H:%M:%S %p")
+
+    snapshots = {}
+    for region in REGIONS:
+        map_columns, map_sync = maps[region]
+        last_good = previous[region]
+        if stats is None and last_good.get("kpis"):
+            derived = {name: last_good.get(name, {}) for name in ("kpis", "grid", "summary")}
+        else:
+            region_stats = (stats or {}).get(region, {})
+            derived = {
+                "kpis": kpis_from_stats(region_stats),
+                "grid": grid_from_stats(region_stats),
+                "summary": summary_from_stats(region_stats),
+            }
+
+        # grid and map are stored column-oriented ({name: [values]}) exactly as
+        # they come out of Arrow; pd.DataFrame() reads them back directly
+        data = {
+            "kpis": derived["kpis"],
+            "grid": derived["grid"],
+            "map": map_columns,
+            "map_sync": map_sync,
+            "summary": derived["summary"],
+            "country_rank": build_country_rank(map_columns),
+            "last_refreshed": last_refreshed
+        }
+        data["version"] = snapshot_version(data)
+        # Render-ready text, panel rows and map points for the dashboard views
+        data.update(build_views(data))
+        logger.debug(f"{region}: {column_rows(data['grid'])} grid rows, {column_rows(data['map'])} map rows")
+        snapshots[region] = data
+    return snapshots
+
+def _kept_datasets(names):
+    """{group: kept columns or None}, read in one round trip"""
+    try:
+        raws = get_redis().mget([f"{DATASET_KEY}:{name}" for name in names])
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read kept {names}: {str(e)}")
+        raws = [None] * len(names)
+    return {name: json.loads(raw) if raw is not None else None for name, raw in zip(names, raws)}
+
+def dataset_entries(fetched):
+    """set_many entries keeping each freshly fetched column group for its TTL"""
+    return {
+        f"{DATASET_KEY}:{name}": (json.dumps(columns), STATS_DATASETS[name]["ttl"])
+        for name, columns in fetched.items()
+    }
+
+def keep_datasets(fetched):
+    """Keep the freshly fetched column groups, all in one round trip"""
+    if not fetched:
+        return
+    try:
+        set_many(dataset_entries(fetched))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not keep {list(fetched)}: {str(e)}")
+
+def stats_datasets_due():
+    """({group: columns} still within their TTL, [groups to re-query])"""
+    kept, due = {}, []
+    for name, columns in _kept_datasets(list(STATS_DATASETS)).items():
+        if columns is None:
+            due.append(name)
+        else:
+            kept[name] = columns
+    if kept:
+        logger.info(f"📦 auction_stats: re-querying {due or 'nothing'}, reusing {list(kept)}")
+    return kept, due
+
+def merge_stats_datasets(groups):
+    """One auction_stats columns dict from its column groups, matched on STATS_KEY"""
+    merged = {}
+    for name in STATS_DATASETS:
+        merged = merge_columns(merged, groups[name], STATS_KEY)
+    return merged
+
+def fetch_stats(region_vals):
+    """(auction_stats columns, {group: columns} re-queried this time)
+
+    Only the column groups whose TTL has expired are re-queried. The columns
+    are None if a due group could not be fetched (the regions then keep
+    their last good KPIs, grid and summary). The re-queried groups are not
+    kept yet: the caller passes them to keep_datasets, or adds
+    dataset_entries to its own set_many, so they go out in one round trip.
+    """
+    groups, due = stats_datasets_due()
+    fetched = {}
+    for name in due:
+        columns = fetch_stats_columns(region_vals, dataset=name)
+        if columns is None:
+            return None, fetched
+        fetched[name] = groups[name] = columns
+    return merge_stats_datasets(groups), fetched
 
 def refresh_data():
     """Refresh data and store in Redis cache"""
     logger.info("🌀 Running refresh_data job")
     try:
-        data = {
-            "kpis": fetch_kpis(),
-            "grid": fetch_grid().to_dict(orient="records"),
-            "map": fetch_map_data().to_dict(orient="records"),
-            "summary": fetch_bidder_summary(),
-            "last_refreshed": datetime.now().strftime("%Y-%m-%d %H:%M:%S %p")
-        }
-
-        # Clean decimals for JSON serialization
-        cleaned_data = clean_decimals(data)
-        
-        # Store in Redis with expiration time (7 minutes to ensure fresh data)
-        redis_conn.setex("auction_data", 420, json.dumps(cleaned_data))
-        # Also save to file as backup
-        os.makedirs("cache", exist_ok=True)
-
-        with open("cache/auction_data.json", "w") as f:
-            json.dump(clean_decimals(data), f)
-        logger.info(f"✅ Cache refreshed successfully at {data['last_refreshed']}")
+        # One auction_stats query and one country query cover every region;
+        # results are split per region afterwards
+        previous = read_previous_snapshots()
+        maps, map_queries = refresh_map(previous)
+        stats_columns, fetched = fetch_stats(region_values())
+        keep_datasets(fetched)
+        # Column groups all reused from their TTL cache add no new trend point
+        publish_snapshots(build_snapshots(previous, maps, stats_columns),
+                          record_history=bool(stats_columns and fetched),
+                          queries=map_queries + len(fetched))
         return True
     except Exception as e:
         logger.error(f"❌ Error refreshing data: {str(e)}")
         return False
 
-def get_cached_data():
-    """Get data from Redis cache, fallback to file or fresh fetch"""
-    try:
-        # Try Redis first
-        cached_data = redis_conn.get("auction_data")
-        if cached_data:
-            logger.info("📦 Retrieved data from Redis cache")
-            return json.loads(cached_data)
-            
-        # Fallback to file cache
-        if os.path.exists("cache/auction_data.json"):
-            logger.info("📁 Retrieved data from file cache")
-            with open("cache/auction_data.json", "r") as f:
-                return json.load(f)
-                
-        # Last resort: fetch fresh data
-        logger.info("🔄 No cache found, fetching fresh data")
-        refresh_data()
-        return get_cached_data()
-        
-    except Exception as e:
-        logger.error(f"❌ Error getting cached data: {str(e)}")
-        # Return empty structure to prevent app crashes
-        return {
-            "kpis": {},
-            "grid": [],
-            "map": [],
-            "summary": {},
-            "last_refreshed": "Cache Error"
-        }
-    
\ No newline at end of file
+def publish_snapshots(snapshots, record_history=True, queries=0):
+    """Publish every region's snapshot and add its KPIs to the trend history
+
+    ``queries`` is the number of BigQuery jobs the refresh ran, counted by
+    the refresh policy.
+    """
+    # Pick the next refresh time from how much the numbers moved; the
+    # screens read it back from the snapshot to pace their polling
+    refresh = after_refresh({region: data["kpis"] for region, data in snapshots.items()}, queries=queries)
+
+    for region, data in snapshots.items():
+        data["refresh"] = refresh
+        # Writes the file backup, the Redis hash and this process's local tier
+        publish(data, region=region)
+        # Kept (stale) KPIs are not new trend points
+        if record_history:
+            try:
+                record_kpis(data["kpis"], region=region)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record KPI history: {str(e)}")
+        logger.info(f"✅ Cache refreshed successfully for {region} at {data['last_refreshed']} (version {data['version']})")
+    # Parquet record of every publish, for offline replay (SNAPSHOT_ARCHIVE_DIR)
+    archive_snapshots(snapshots)
@@ -0,0 +1,148 @@
+"""Circuit breakers for the data sources of the refresh path.
+
+A breaker opens after FAILURE_THRESHOLD consecutive failures of its source.
+While open, fetches are skipped and the refresh keeps the last good snapshot
+sections. Once the backoff has passed, one caller is let through as a
+half-open probe: success closes the breaker, failure re-opens it with the
+backoff doubled (up to MAX_BACKOFF).
+
+State is mirrored to Redis so every refresher process and pod shares one
+breaker per source instead of each hammering a failing source on its own.
+Without Redis each process falls back to its in-memory copy.
+"""
+import json
+import threading
+import time
+
+from config import CONFIG, logger
+from redis_client import get_redis
+
+BREAKER_KEY = "auction_breaker"
+FAILURE_THRESHOLD = CONFIG.get("BREAKER_FAILURE_THRESHOLD", 3)
+BASE_BACKOFF = CONFIG.get("BREAKER_BACKOFF_SECONDS", 30)
+MAX_BACKOFF = CONFIG.get("BREAKER_MAX_BACKOFF_SECONDS", 900)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.key = f"{BREAKER_KEY}:{name}"
+        self._lock = threading.Lock()
+        self._state = {
+            "state": CLOSED,
+            "since": time.time(),
+            "failures": 0,
+            "backoff": backoff,
+            "retry_at": 0,
+            "last_error": None,
+        }
+
+    def _load(self):
+        try:
+            raw = get_redis().get(self.key)
+            if raw is not None:
+                self._state = json.loads(raw)
+        except Exception as e:
+            logger.debug(f"Breaker {self.name}: using in-process state ({e})")
+        return dict(self._state)
+
+    def _save(self, state, release_probe=False):
+        """Mirror ``state`` to Redis, and free the probe slot in the same round trip"""
+        self._state = state
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.set(self.key, json.dumps(state))
+            if release_probe:
+                pipe.delete(f"{self.key}:probe")
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Breaker {self.name}: state not mirrored to Redis ({e})")
+
+    def _claim_probe(self, seconds):
+        """Only one process probes a half-open source at a time"""
+        try:
+            return bool(get_redis().set(f"{self.key}:probe", 1, nx=True, ex=max(1, int(seconds))))
+        except Exception:
+            return True
+
+    def _move(self, state, new_state, now):
+        if state["state"] != new_state:
+            logger.warning(f"🔌 Breaker {self.name}: {state['state']} -> {new_state}")
+            state["state"] = new_state
+            state["since"] = now
+
+    def allow(self):
+        """True if the source may be called now"""
+        now = time.time()
+        with self._lock:
+            state = self._load()
+            if state["state"] == CLOSED:
+                return True
+            if now < state["retry_at"] or not self._claim_probe(state["backoff"]):
+                return False
+            # A probe that never reports back counts as failed after one backoff
+            state["retry_at"] = now + state["backoff"]
+            self._move(state, HALF_OPEN, now)
+            self._save(state)
+            return True
+
+    def record_success(self):
+        now = time.time()
+        with self._lock:
+            state = self._load()
+            if state["state"] == CLOSED and not state["failures"]:
+                return
+            self._move(state, CLOSED, now)
+            state.update({"failures": 0, "backoff": self.base_backoff, "retry_at": 0})
+            self._save(state, release_probe=True)
+
+    def record_failure(self, error):
+        now = time.time()
+        with self._lock:
+            state = self._load()
+            state["failures"] += 1
+            state["last_error"] = str(error)[:200]
+            if state["state"] != CLOSED:
+                state["backoff"] = min(state["backoff"] * 2, self.max_backoff)
+            elif state["failures"] >= self.failure_threshold:
+                state["backoff"] = self.base_backoff
+            else:
+                self._save(state)
+                return
+            state["retry_at"] = now + state["backoff"]
+            self._move(state, OPEN, now)
+            self._save(state, release_probe=True)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            state = self._load()
+        return {
+            "state": state["state"],
+            "seconds_in_state": now - state["since"],
+            "failures": state["failures"],
+            "backoff_seconds": state["backoff"],
+            "retry_in_seconds": max(0.0, state["retry_at"] - now) if state["state"] != CLOSED else 0.0,
+            "last_error": state["last_error"],
+        }
+
+
+_breakers = {}
+
+
+def get_breaker(name):
+    """The breaker of a data source, created on first use"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_stats():
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,96 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class SchemaError(ValueError):
+    """A fetched table is missing a declared column or holds values its type can't"""
+
+
+def decimal_to_float(column):
+    """NUMERIC/BIGNUMERIC (decimal) column -> float64, each value the nearest float
+
+    A direct decimal -> float64 cast divides the scaled integer and can land
+    one ulp off (29 becomes 29.000000000000004); going through the decimal
+    string rounds exactly, like float(Decimal) does per value.
+    """
+    return pc.cast(pc.cast(column, pa.string()), pa.float64())
+
+
+def apply_schema(table, schema, name="table"):
+    """Cast the columns declared in ``schema`` ({column: Arrow type}) in one vectorised pass
+
+    Undeclared columns are left as they are. Casts are safe, so a fractional
+    or overflowing count raises SchemaError instead of being truncated.
+    """
+    missing = [column for column in schema if column not in table.column_names]
+    if missing:
+        raise SchemaError(f"{name} is missing columns {missing}")
+    for column, col_type in schema.items():
+        index = table.schema.get_field_index(column)
+        if table.schema.field(index).type == col_type:
+            continue
+        try:
+            values = table.column(index)
+            if pa.types.is_decimal(values.type) and pa.types.is_floating(col_type):
+                values = decimal_to_float(values)
+            table = table.set_column(index, column, pc.cast(values, col_type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise SchemaError(f"{name}.{column} is not {col_type}: {e}") from e
+    return table
+
+
+def arrow_to_columns(table, schema=None, name="table"):
+    """Convert an Arrow table into JSON-ready columns ({name: [values]})
+
+    With a ``schema`` the declared columns are validated and cast first (see
+    apply_schema). Remaining NUMERIC/BIGNUMERIC (decimal) columns become
+    float64 (see decimal_to_float) and TIMESTAMP/DATE columns become ISO
+    strings, both as vectorised casts, so the result can be passed straight to
+    json.dumps without walking rows in Python.
+    """
+    if schema:
+        table = apply_schema(table, schema, name)
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        col_type = column.type
+        if pa.types.is_decimal(col_type):
+            column = decimal_to_float(column)
+        elif pa.types.is_timestamp(col_type) or pa.types.is_date(col_type):
+            column = pc.cast(column, pa.string())
+        columns[name] = column.to_pylist()
+    return columns
+
+
+def merge_columns(base, changes, key):
+    """Upsert the rows in ``changes`` into ``base``, matching on column ``key``
+
+    Both arguments are columns dicts. ``key`` is a column name or a tuple of
+    them. Rows in ``base`` that are not in ``changes`` are kept as they are;
+    columns missing on either side are filled with None.
+    """
+    changed_rows = column_rows(changes)
+    if not changed_rows:
+        return base
+    keys = (key,) if isinstance(key, str) else tuple(key)
+    base_rows = column_rows(base)
+    names = list(base) + [name for name in changes if name not in base]
+    merged = {name: list(base.get(name, [None] * base_rows)) for name in names}
+    index = {row_key: pos for pos, row_key in enumerate(zip(*(merged.get(k, []) for k in keys)))}
+
+    for row in range(changed_rows):
+        row_key = tuple(changes[k][row] for k in keys)
+        pos = index.get(row_key)
+        if pos is None:
+            pos = index[row_key] = column_rows(merged)
+            for name in names:
+                merged[name].append(None)
+        for name, values in changes.items():
+            merged[name][pos] = values[row]
+    return merged
+
+
+def column_rows(columns):
+    """Number of rows in a columns dict"""
+    for values in columns.values():
+        return len(values)
+    return 0
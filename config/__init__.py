@@ -1,6 +1,7 @@
 import os
 import logging
 from dotenv import load_dotenv
+from .logging_setup import setup_logging
 
 
 # Load variables from .env file, if it exists
@@ -11,14 +12,8 @@ os.makedirs("/tmp/logs", exist_ok=True)
 env = os.environ.get("APP_ENV", "dev").lower()
 log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
 
-logging.basicConfig(
-    level=getattr(logging, log_level, logging.INFO),
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("/tmp/logs/app.log"),
-        logging.StreamHandler()
-    ]
-)
+# Background queue listener; per-logger levels e.g. LOG_LEVELS="cache_data=DEBUG"
+setup_logging(log_level, os.environ.get("LOG_LEVELS", ""))
 
 logger=logging.getLogger(__name__)
 
@@ -3,7 +3,68 @@ CONFIG = {
     "DEBUG": False,
     "PORT": 8080,
     "VERSION": "1.0.0-dev",
-    "REFRESH_INTERVAL_MS": 900000,  
+    # First client poll only; after that screens poll at the refresh policy interval
+    "REFRESH_INTERVAL_MS": 60000,
+    # Adaptive refresh cadence (refresh_policy.py): refresh every
+    # REFRESH_LIVE_SECONDS while auction numbers move or during LIVE_HOURS,
+    # otherwise back off by REFRESH_BACKOFF up to REFRESH_MAX_SECONDS
+    "REFRESH_LIVE_SECONDS": 60,
+    "REFRESH_MAX_SECONDS": 1800,
+    "REFRESH_BACKOFF": 2,
+    "LIVE_HOURS": {
+        "timezone": "America/Chicago",
+        "days": [0, 1, 2, 3, 4],  # Monday-Friday
+        "start": "08:00",
+        "end": "17:00",
+    },
+    # Circuit breakers on BigQuery sources (circuit_breaker.py): open after
+    # this many consecutive failures, probe again after a doubling backoff
+    "BREAKER_FAILURE_THRESHOLD": 3,
+    "BREAKER_BACKOFF_SECONDS": 30,
+    "BREAKER_MAX_BACKOFF_SECONDS": 900,
+    # How long each fetched dataset stays fresh before it is queried again.
+    # map: RQ refresh job (refresh_jobs.py); stats_today/stats_ly:
+    # auction_stats column groups (data_service.STATS_DATASETS), whose
+    # shortest TTL also paces the RQ stats job. value_ly changes at most
+    # daily; 6 hours bounds how stale it gets after the load
+    "DATASET_TTL_SECONDS": {
+        "map": 300,
+        "stats_today": 60,
+        "stats_ly": 21600,
+    },
+    # async_refresh.py cancels BigQuery jobs still running after this long
+    "QUERY_DEADLINE_SECONDS": 120,
+    # Map refresh: fetch only countries updated since the last pull, with a
+    # full re-select every MAP_FULL_RECONCILE_SECONDS to drop deleted rows
+    "MAP_INCREMENTAL": True,
+    "MAP_FULL_RECONCILE_SECONDS": 3600,
+    # Query backend (data_backends.py): "bigquery", or "duckdb" to run the
+    # same queries over local Parquet files in DUCKDB_PARQUET_DIR. Both can
+    # be overridden by the environment variables of the same name
+    "DATA_BACKEND": "bigquery",
+    "DUCKDB_PARQUET_DIR": None,
+    # Archive every published snapshot to Parquet here for offline replay
+    # (snapshot_archive.py); None turns recording off
+    "SNAPSHOT_ARCHIVE_DIR": None,
+    # "bubble" (mapbox tiles) or "choropleth" (bundled shapes, no tile server,
+    # see geo_shapes.py); a screen can override it with ?map=choropleth
+    "MAP_MODE": "bubble",
+    # In-process snapshot tier in front of Redis (snapshot_cache.py)
+    "LOCAL_CACHE_TTL_SECONDS": 10,
+    "LOCAL_CACHE_MAX_ENTRIES": 64,
+    # Full-render outputs memoised in Redis per snapshot version (render_cache.py)
+    "RENDER_CACHE_TTL_SECONDS": 900,
+    # KPI trend buffer (kpi_history.py): 5 minute buckets, 24 hours kept
+    "HISTORY_INTERVAL_SECONDS": 300,
+    "HISTORY_MAX_POINTS": 288,
+    # Per-region snapshots (regions.py), chosen with ?region=<key>. Set
+    # REGION_COLUMN and give each region the value it has in that column,
+    # e.g. "us": {"label": "US", "value": "US"}
+    "REGION_COLUMN": None,
+    "DEFAULT_REGION": "all",
+    "REGIONS": {
+        "all": {"label": "US and Canada combined"},
+    },
     "METRIC_LABEL_MAP": {
         "lots_sold" : "LOTS SOLD",
         "net_value_sold" : "NET VALUE SOLD",
@@ -0,0 +1,133 @@
+"""Queue-based, structured logging.
+
+Loggers only put records on an in-memory queue. A QueueListener thread
+formats them and writes them to /tmp/logs/app.log (JSON lines) and stderr,
+so log I/O never runs inside a Dash callback.
+
+Per-logger levels come from LOG_LEVELS, e.g.
+LOG_LEVELS="auction_dashboard=WARNING,cache_data=DEBUG".
+
+Per-tick events pass extra={"sample": "<key>"}. At most one record per key
+is kept every SAMPLE_SECONDS, and it carries the number of records dropped
+since the last one (logged as "suppressed").
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FILE = "/tmp/logs/app.log"
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+SAMPLE_SECONDS = float(os.environ.get("LOG_SAMPLE_SECONDS", 60))
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_queue = queue.SimpleQueue()
+_handlers = []
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields included"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # QueueHandler has already folded any traceback into the message
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Keeps one record per sample key every `seconds`; other records pass through"""
+
+    def __init__(self, seconds=SAMPLE_SECONDS):
+        super().__init__()
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._last = {}
+        self._dropped = {}
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, float("-inf")) < self.seconds:
+                self._dropped[key] = self._dropped.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            record.suppressed = self._dropped.pop(key, 0)
+        return True
+
+
+def parse_levels(spec):
+    """{"logger": level} from "name=LEVEL,name=LEVEL" (unknown levels are skipped)"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        level = getattr(logging, level.strip().upper(), None)
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def _start_listener():
+    global _listener
+    _listener = QueueListener(_queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def flush_logging():
+    """Write out every queued record now (the listener is stopped and restarted)
+
+    For forked children that leave through os._exit, such as RQ work horses:
+    atexit never runs there, so whatever is still queued would be lost.
+    """
+    if _listener is None:
+        return
+    _stop_listener()
+    _start_listener()
+
+
+def setup_logging(level="INFO", logger_levels="", log_file=LOG_FILE):
+    """Route the root logger through the background queue (idempotent)"""
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    for name, logger_level in parse_levels(logger_levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+    if _listener is not None:
+        return
+
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(JsonFormatter())
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    _handlers.extend([file_handler, stream_handler])
+
+    queue_handler = QueueHandler(_queue)
+    queue_handler.addFilter(SampleFilter())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    # Threads don't survive fork; give worker processes their own listener.
+    # Children that exit through os._exit must call flush_logging() first
+    os.register_at_fork(after_in_child=_start_listener)
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import threading
+import time
+from config import logger, CONFIG
+
+# Query backends behind data_service. Every fetch builds its SQL through the
+# active backend (table names, parameter placeholders, array membership) and
+# runs it with query_arrow / query_arrow_async, so the same query shapes run
+# against BigQuery in production and against local Parquet files (DuckDB) on
+# a laptop or CI box.
+
+# Source tables the dashboard reads, as named in the BigQuery dataset
+BQ_DATASET = "cprtpr-dataplatform-sp1.usmart"
+TABLES = ("auction_stats", "auction_stats_cntry")
+
+
+class BigQueryBackend:
+    """BigQuery with results downloaded as Arrow over the Storage Read API"""
+    name = "bigquery"
+
+    # Polling bounds for running query jobs (async path)
+    JOB_POLL_MIN_SECONDS = 0.25
+    JOB_POLL_MAX_SECONDS = 2.0
+
+    def __init__(self, key_path=None):
+        from google.cloud import bigquery
+        from google.cloud import bigquery_storage
+        from google.oauth2 import service_account
+
+        key_path = key_path or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+        if not key_path:
+            raise EnvironmentError("GOOGLE_APPLICATION_CREDENTIALS is not set in environment variables.")
+        credentials = service_account.Credentials.from_service_account_file(key_path)
+        self._bigquery = bigquery
+        self.client = bigquery.Client(credentials=credentials, project=credentials.project_id)
+        # Storage Read API client: large results stream as Arrow record batches
+        # instead of paging JSON rows through the REST API
+        self.storage_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+
+    def table(self, name):
+        return f"{BQ_DATASET}.{name}"
+
+    def param(self, name):
+        return f"@{name}"
+
+    def in_array(self, column, name):
+        return f"{column} in unnest(@{name})"
+
+    def _job_config(self, params):
+        bigquery = self._bigquery
+        query_parameters = []
+        for name, value in (params or {}).items():
+            if isinstance(value, (list, tuple)):
+                query_parameters.append(bigquery.ArrayQueryParameter(name, "STRING", list(value)))
+            elif hasattr(value, "tzinfo"):
+                query_parameters.append(bigquery.ScalarQueryParameter(name, "TIMESTAMP", value))
+            else:
+                query_parameters.append(bigquery.ScalarQueryParameter(name, None, value))
+        return bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+    def query_arrow(self, query, params=None):
+        """Run a query and download the result as an Arrow table"""
+        job = self.client.query(query, job_config=self._job_config(params))
+        table = job.result().to_arrow(bqstorage_client=self.storage_client)
+        logger.debug("query %s: %d rows, %s bytes processed", job.job_id, table.num_rows, job.total_bytes_processed)
+        return table
+
+    async def query_arrow_async(self, query, params=None, deadline=None):
+        """Submit a query, poll it without blocking the event loop, and download it as Arrow
+
+        A job still running after ``deadline`` seconds is cancelled and
+        TimeoutError raised. The HTTP calls of the BigQuery client are blocking,
+        so each one runs in a worker thread; the loop is free in between.
+        """
+        job = await asyncio.to_thread(self.client.query, query, job_config=self._job_config(params))
+        started = time.monotonic()
+        delay = self.JOB_POLL_MIN_SECONDS
+        while True:
+            await asyncio.to_thread(job.reload)
+            if job.state == "DONE":
+                break
+            if deadline is not None and time.monotonic() - started > deadline:
+                await asyncio.to_thread(job.cancel)
+                raise TimeoutError(f"query {job.job_id} still running after {deadline}s; cancelled")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.JOB_POLL_MAX_SECONDS)
+        table = await asyncio.to_thread(job.to_arrow, bqstorage_client=self.storage_client)
+        logger.debug("query %s: %d rows, %s bytes processed", job.job_id, table.num_rows, job.total_bytes_processed)
+        return table
+
+
+class DuckDBBackend:
+    """DuckDB over local Parquet files, one directory (or file) per source table
+
+    ``<parquet_dir>/auction_stats/*.parquet`` (or ``auction_stats.parquet``)
+    is exposed as view ``auction_stats``, and likewise for every name in
+    TABLES. Write a dataset with benchmarks/make_parquet.py.
+    """
+    name = "duckdb"
+
+    def __init__(self, parquet_dir=None):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise EnvironmentError("DATA_BACKEND=duckdb needs the duckdb package (pip install duckdb)") from e
+
+        parquet_dir = parquet_dir or os.environ.get("DUCKDB_PARQUET_DIR") or CONFIG.get("DUCKDB_PARQUET_DIR")
+        if not parquet_dir:
+            raise EnvironmentError("DUCKDB_PARQUET_DIR is not set for DATA_BACKEND=duckdb.")
+        self.parquet_dir = parquet_dir
+        self.conn = duckdb.connect()
+        for name in TABLES:
+            path = os.path.join(parquet_dir, name)
+            source = os.path.join(path, "*.parquet") if os.path.isdir(path) else path + ".parquet"
+            if not os.path.isdir(path) and not os.path.exists(source):
+                raise FileNotFoundError(f"No Parquet data for {name} under {parquet_dir}")
+            self.conn.execute(f"create view {name} as select * from read_parquet('{source}')")
+        # One cursor per thread: a DuckDB connection is not safe to share
+        self._local = threading.local()
+        logger.info(f"🦆 DuckDB backend reading Parquet from {parquet_dir}")
+
+    def table(self, name):
+        return name
+
+    def param(self, name):
+        return f"${name}"
+
+    def in_array(self, column, name):
+        return f"list_contains(${name}, {column})"
+
+    def _cursor(self):
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self.conn.cursor()
+        return cursor
+
+    def query_arrow(self, query, params=None):
+        """Run a query and return the result as an Arrow table"""
+        table = self._cursor().execute(query, params or {}).fetch_arrow_table()
+        logger.debug("duckdb query: %d rows", table.num_rows)
+        return table
+
+    async def query_arrow_async(self, query, params=None, deadline=None):
+        """query_arrow in a worker thread; TimeoutError after ``deadline`` seconds"""
+        return await asyncio.wait_for(asyncio.to_thread(self.query_arrow, query, params), deadline)
+
+
+BACKENDS = {
+    "bigquery": BigQueryBackend,
+    "duckdb": DuckDBBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured query backend, created on first use
+
+    Chosen with the DATA_BACKEND environment variable or config key
+    ("bigquery" by default). Creating it can fail (missing credentials or
+    Parquet files); the error is raised to the caller and creation is retried
+    on the next call.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("DATA_BACKEND") or CONFIG.get("DATA_BACKEND", "bigquery")
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown DATA_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+                _backend = BACKENDS[name]()
+    return _backend
@@ -1,99 +1,233 @@
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import os
+import asyncio
 import pandas as pd
+import pyarrow as pa
 from config import logger, CONFIG
-import json
-from decimal import Decimal
-
-key_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-if not key_path:
-    raise EnvironmentError("GOOGLE_APPLICATION_CREDENTIALS is not set in environment variables.")
-
-credentials = service_account.Credentials.from_service_account_file(key_path)
-bq_client = bigquery.Client(credentials=credentials, project=credentials.project_id)
-
-# Function to fetch KPIs from BigQuery
-# This function retrieves key performance indicators (KPIs) related to auctions from a BigQuery database
-
-
-METRIC_MAP = {
-    "LOTS SOLD": "lots_sold",
-    "AUCTION EVENTS RUN": "auction_events_run",
-    "BIDDER COUNTRIES": "bidder_countries",
-    "GROSS VALUE SOLD": "gross_value_sold",
-    "NET VALUE SOLD": "net_value_sold",
-    "UNIQUE BIDDERS": "unique_bidders",
-    "BIDS RECEIVED": "bids_received",
-    "HIGHEST BID PLACED": "highest_bid_placed",
-    "DOLLARS BID": "dollars_bid"
+from columnar import arrow_to_columns
+from regions import REGION_COLUMN
+from auction_metrics import kpis_from_stats, grid_from_stats, summary_from_stats
+from circuit_breaker import get_breaker
+from data_backends import get_backend
+
+# Queries run on the backend chosen by DATA_BACKEND (data_backends.py):
+# BigQuery in production, DuckDB over local Parquet for laptop/CI runs. The
+# backend is created on first query, so importing this module needs no
+# credentials; a missing one fails the fetch (and trips its breaker) instead.
+
+
+# Declared types for the refresh path, applied once at fetch time so the
+# snapshot never needs coercing downstream. auction_stats holds counts and
+# money in the same value columns, so both are float64 there.
+STATS_SCHEMA = {
+    "metric": pa.string(),
+    "value_today": pa.float64(),
+    "value_ly": pa.float64(),
+    "last_updated_dt": pa.timestamp("us", tz="UTC"),
 }
+MAP_SCHEMA = {
+    "country_long_name": pa.string(),
+    "lat": pa.float64(),
+    "long": pa.float64(),
+    "bid_counts": pa.int32(),
+    "unique_bidders": pa.int32(),
+    "dollars_bid": pa.float64(),
+    "highest_bid_placed": pa.float64(),
+    "last_updated_dt": pa.timestamp("us", tz="UTC"),
+}
+if REGION_COLUMN:
+    STATS_SCHEMA[REGION_COLUMN] = MAP_SCHEMA[REGION_COLUMN] = pa.string()
+
+
+# Column groups of auction_stats, each re-queried only once its TTL has
+# expired (BigQuery bills by the columns a query reads). value_ly changes at
+# most daily, so it is not read on every refresh like value_today.
+_dataset_ttls = CONFIG.get("DATASET_TTL_SECONDS", {})
+STATS_DATASETS = {
+    "stats_today": {
+        "columns": ("metric", "value_today", "last_updated_dt"),
+        "ttl": _dataset_ttls.get("stats_today", 60),
+    },
+    "stats_ly": {
+        "columns": ("metric", "value_ly"),
+        "ttl": _dataset_ttls.get("stats_ly", 21600),
+    },
+}
+# Columns a group's rows are matched on when merging them back together
+STATS_KEY = ("metric", REGION_COLUMN) if REGION_COLUMN else ("metric",)
+
+
+def _dataset_columns(dataset):
+    columns = STATS_DATASETS[dataset]["columns"] if dataset else tuple(STATS_SCHEMA)
+    return [name for name in columns if name != REGION_COLUMN]
+
+
+def _stats_columns(table, dataset=None):
+    schema = {name: STATS_SCHEMA[name] for name in _dataset_columns(dataset)}
+    if REGION_COLUMN:
+        schema[REGION_COLUMN] = STATS_SCHEMA[REGION_COLUMN]
+    return arrow_to_columns(table, schema, dataset or "auction_stats")
+
+def _map_columns(table):
+    return arrow_to_columns(table, MAP_SCHEMA, "auction_stats_cntry")
+
+
+# One breaker per source table used by the refresh path
+stats_breaker = get_breaker("auction_stats")
+map_breaker = get_breaker("auction_stats_cntry")
+
+
+def _guarded(breaker, name, fetch):
+    """Run ``fetch`` through ``breaker``; None if it failed or the breaker is open"""
+    if not breaker.allow():
+        logger.warning("%s skipped: %s breaker is open", name, breaker.name)
+        return None
+    try:
+        result = fetch()
+    except Exception as e:
+        logger.error("%s failed: %s", name, str(e))
+        breaker.record_failure(e)
+        return None
+    breaker.record_success()
+    return result
+
+
+async def _guarded_async(breaker, name, fetch):
+    """_guarded for coroutines; breaker bookkeeping runs off the event loop"""
+    if not await asyncio.to_thread(breaker.allow):
+        logger.warning("%s skipped: %s breaker is open", name, breaker.name)
+        return None
+    try:
+        result = await fetch()
+    except Exception as e:
+        logger.error("%s failed: %s", name, str(e))
+        await asyncio.to_thread(breaker.record_failure, e)
+        return None
+    await asyncio.to_thread(breaker.record_success)
+    return result
 
+
+def _query_arrow(query, params=None):
+    """Run a query on the active backend and return the result as an Arrow table"""
+    return get_backend().query_arrow(query, params)
+
+async def _query_arrow_async(query, params=None, deadline=None):
+    """_query_arrow without blocking the event loop; TimeoutError after ``deadline`` seconds"""
+    backend = await asyncio.to_thread(get_backend)
+    return await backend.query_arrow_async(query, params, deadline=deadline)
+
+STATS_QUERY = """
+    select {columns}{region_select}
+    from {table}
+    where true
+"""
+
+def _region_filter(backend, region_values):
+    """SQL filter and query parameters restricting a query to the given regions"""
+    if not REGION_COLUMN or region_values is None:
+        return "", {}
+    return f"    and {backend.in_array(REGION_COLUMN, 'regions')}\n", {"regions": list(region_values)}
+
+def _stats_query(region_values, dataset=None):
+    backend = get_backend()
+    region_sql, params = _region_filter(backend, region_values)
+    region_select = f", {REGION_COLUMN}" if REGION_COLUMN else ""
+    columns = ", ".join(_dataset_columns(dataset))
+    query = STATS_QUERY.format(columns=columns, region_select=region_select,
+                               table=backend.table("auction_stats")) + region_sql
+    return query, params
+
+def _fetch_stats(region_values=None, dataset=None):
+    return _stats_columns(_query_arrow(*_stats_query(region_values, dataset)), dataset)
+
+def fetch_stats_columns(region_values=None, dataset=None):
+    """Every auction_stats row for all regions in one query, as columns
+
+    KPIs, the grid and the bidder summary are all derived from this result
+    (see auction_metrics). With ``dataset`` (a STATS_DATASETS name) only that
+    column group is read. Returns None if the query failed or the
+    auction_stats breaker is open.
+    """
+    return _guarded(stats_breaker, f"fetch_stats_columns({dataset or 'all'})",
+                    lambda: _fetch_stats(region_values, dataset))
+
+async def fetch_stats_columns_async(region_values=None, deadline=None, dataset=None):
+    """fetch_stats_columns for the asyncio refresher"""
+    async def fetch():
+        query, params = await asyncio.to_thread(_stats_query, region_values, dataset)
+        table = await _query_arrow_async(query, params, deadline=deadline)
+        return _stats_columns(table, dataset)
+    return await _guarded_async(stats_breaker, f"fetch_stats_columns_async({dataset or 'all'})", fetch)
+
+# Function to fetch KPIs from the auction_stats table
+# The legacy fetch_* helpers below derive their results from the same stats
+# query as the refresh path (see auction_metrics), so every backend runs one
+# portable query shape instead of dialect-specific SQL per helper
 def fetch_kpis():
     try:
-        query = """
-            SELECT metric, value_today, value_ly
-            FROM `cprtpr-dataplatform-sp1.usmart.auction_stats`
-        """
-        df = bq_client.query(query).to_dataframe()
-        
-        result = {}
-        for _, row in df.iterrows():
-            key = METRIC_MAP.get(row["metric"])
-            if key:
-                result[key] = {
-                    "today": float(row["value_today"] or 0),
-                    "ly": float(row["value_ly"] or 0)
-                }
-
-        return result
+        return kpis_from_stats(_fetch_stats())
     except Exception as e:
         logger.error("fetch_kpis failed: %s", str(e))
         return {}
 
 
+def fetch_grid_columns():
+    """Grid rows as columns ({name: [values]}), straight from Arrow"""
+    try:
+        return grid_from_stats(_fetch_stats())
+    except Exception as e:
+        logger.error("fetch_grid_columns failed: %s", str(e))
+        return {}
+
 def fetch_grid():
     try:
-        query = """
-          select metric,value_today, value_ly from cprtpr-dataplatform-sp1.usmart.auction_stats
-        
-        """
-        df = bq_client.query(query).to_dataframe()
-        return df
+        return pd.DataFrame(fetch_grid_columns())
     except Exception as e:
-        logger.error("fetch_map_data failed: %s", str(e))
+        logger.error("fetch_grid failed: %s", str(e))
         return pd.DataFrame()
 
 def fetch_bidder_summary():
     try:
-       query = """
-        SELECT
-            SUM(value_today) AS bidders,
-            FORMAT_TIMESTAMP('%Y-%b-%d %H:%M:%S', MAX(last_updated_dt)) as last_up_date
-        FROM
-            cprtpr-dataplatform-sp1.usmart.auction_stats
-        WHERE
-            metric = "UNIQUE BIDDERS"
-        
-       """
-       df = bq_client.query(query).to_dataframe()
-       return {
-        "bidders": int(df["bidders"].iloc[0]),
-        "last_up_date": df["last_up_date"].iloc[0]
-       }
+       return summary_from_stats(_fetch_stats())
     except Exception as e:
         logger.error("fetch_bidder_summary failed: %s", str(e))
         return {"bidders": 0,
                  "last_up_date": "N/A"}
 
+MAP_QUERY = """
+    select * from {table}
+    where country_long_name not in ('-','Afghanistan','Pakistan','Russian Federation','Iraq','Palestine, State of','Iran','China','North Korea','Saudi Arabia','Myanmar','Syria','Yemen','Somalia','Libya','Myanmar','Belarus','Venezuela','Cuba','Mali','Eritrea')
+"""
+
+def _map_query(region_values, since=None):
+    backend = get_backend()
+    region_sql, params = _region_filter(backend, region_values)
+    if since is not None:
+        region_sql += f"    and last_updated_dt > {backend.param('since')}\n"
+        params["since"] = pd.Timestamp(since).to_pydatetime()
+    return MAP_QUERY.format(table=backend.table("auction_stats_cntry")) + region_sql, params
+
+def fetch_map_columns(region_values=None):
+    """Country rows (for all regions) as columns ({name: [values]}), straight from Arrow
+
+    Returns None if the query failed or the country breaker is open.
+    """
+    return _guarded(map_breaker, "fetch_map_columns",
+                    lambda: _map_columns(_query_arrow(*_map_query(region_values))))
+
+def fetch_map_columns_since(watermark, region_values=None):
+    """Country rows whose last_updated_dt is after ``watermark``, as columns (None on failure)"""
+    return _guarded(map_breaker, "fetch_map_columns_since",
+                    lambda: _map_columns(_query_arrow(*_map_query(region_values, since=watermark))))
+
+async def fetch_map_columns_async(region_values=None, since=None, deadline=None):
+    """fetch_map_columns (or, with ``since``, fetch_map_columns_since) for the asyncio refresher"""
+    async def fetch():
+        query, params = await asyncio.to_thread(_map_query, region_values, since)
+        return _map_columns(await _query_arrow_async(query, params, deadline=deadline))
+    return await _guarded_async(map_breaker, "fetch_map_columns_async", fetch)
+
 def fetch_map_data():
    try:
-    query = """
-        select * from cprtpr-dataplatform-sp1.usmart.auction_stats_cntry
-        where country_long_name not in ('-','Afghanistan','Pakistan','Russian Federation','Iraq','Palestine, State of','Iran','China','North Korea','Saudi Arabia','Myanmar','Syria','Yemen','Somalia','Libya','Myanmar','Belarus','Venezuela','Cuba','Mali','Eritrea')
-     """
-    df = bq_client.query(query).to_dataframe()
-    return df
+    return pd.DataFrame(fetch_map_columns() or {})
    except Exception as e:
        logger.error("fetch_map_data failed: %s", str(e))
        return pd.DataFrame()
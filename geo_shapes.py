@@ -0,0 +1,156 @@
+"""Pre-simplified country shapes for the offline choropleth map.
+
+The shapes live in assets/geo/countries.json, one GeoJSON feature per
+country with properties.name matching country_long_name. Figures reference
+the file by URL. Dash serves it from assets/, and plotly.js fetches it once
+per page, so no tile server is involved and each figure carries only names
+and values.
+
+The bundled file is built from Natural Earth 1:110m admin 0 countries
+(public domain). Rebuild it from any country GeoJSON with:
+
+    python geo_shapes.py ne_110m_admin_0_countries.geojson
+
+Rings are simplified with Douglas-Peucker and coordinates are rounded, which
+keeps the file small enough to ship in the image.
+"""
+import json
+import os
+import sys
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from config import CONFIG, logger
+
+SHAPES_PATH = os.path.join("assets", "geo", "countries.json")
+SHAPES_URL = "/assets/geo/countries.json"
+TOLERANCE_DEGREES = 0.1
+COORD_DECIMALS = 2
+MAP_MODES = ("bubble", "choropleth")
+
+# country_long_name -> the name Natural Earth (and most GeoJSON sources) use
+NAME_ALIASES = {
+    "Bolivia (Plurinational State of)": "Bolivia",
+    "Bosnia and Herzegovina": "Bosnia and Herz.",
+    "Brunei Darussalam": "Brunei",
+    "Central African Republic": "Central African Rep.",
+    "Congo (the Democratic Republic of the)": "Dem. Rep. Congo",
+    "Curacao": "Curaçao",
+    "Dominican Republic": "Dominican Rep.",
+    "Equatorial Guinea": "Eq. Guinea",
+    "Eswatini": "eSwatini",
+    "Iran (Islamic Republic of)": "Iran",
+    "Korea (the Democratic People's Republic of)": "North Korea",
+    "Korea (the Republic of)": "South Korea",
+    "Lao People's Democratic Republic": "Laos",
+    "Moldova (the Republic of)": "Moldova",
+    "Netherlands (Kingdom of the)": "Netherlands",
+    "Palestine, State of": "Palestine",
+    "Russian Federation": "Russia",
+    "Saint Barthelemy": "Saint Barthélemy",
+    "Solomon Islands": "Solomon Is.",
+    "South Sudan": "S. Sudan",
+    "Syrian Arab Republic": "Syria",
+    "Taiwan (Province of China)": "Taiwan",
+    "Tanzania, the United Republic of": "Tanzania",
+    "Turkiye": "Turkey",
+    "United Kingdom of Great Britain and Northern Ireland": "United Kingdom",
+    "Venezuela (Bolivarian Republic of)": "Venezuela",
+    "Viet Nam": "Vietnam",
+    "Western Sahara": "W. Sahara",
+}
+SOURCE_NAME_FIELDS = ("ADMIN", "NAME_LONG", "NAME", "NAME_EN", "FORMAL_EN", "name")
+
+
+def map_mode(search):
+    """Map mode from '?map=choropleth', else CONFIG["MAP_MODE"]"""
+    mode = parse_qs((search or "").lstrip("?")).get("map", [CONFIG.get("MAP_MODE", "bubble")])[0]
+    return mode if mode in MAP_MODES else "bubble"
+
+
+@lru_cache(maxsize=1)
+def shape_names():
+    """Country names in the bundled shapes, read once; None if the file hasn't been built"""
+    try:
+        with open(SHAPES_PATH, "r", encoding="utf-8") as f:
+            return tuple(feature["properties"]["name"] for feature in json.load(f)["features"])
+    except FileNotFoundError:
+        logger.warning(f"⚠️ {SHAPES_PATH} not found; choropleth map falls back to bubbles")
+        return None
+
+
+def _perpendicular(point, start, end):
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx == dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x2 * y1 - y2 * x1) / (dx * dx + dy * dy) ** 0.5
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker simplification of a list of [x, y] points"""
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        best, index = 0.0, None
+        for i in range(first + 1, last):
+            distance = _perpendicular(points[i], points[first], points[last])
+            if distance > best:
+                best, index = distance, i
+        if index is not None and best > tolerance:
+            keep[index] = True
+            stack.extend([(first, index), (index, last)])
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _simplify_polygon(rings, tolerance):
+    rings = [
+        [[round(x, COORD_DECIMALS), round(y, COORD_DECIMALS)] for x, y in simplify(ring, tolerance)]
+        for ring in rings
+    ]
+    # An outline that collapses below a closed triangle is an island too small to see
+    if len(rings[0]) < 4:
+        return None
+    return [rings[0]] + [ring for ring in rings[1:] if len(ring) >= 4]
+
+
+def simplify_geometry(geometry, tolerance=TOLERANCE_DEGREES):
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    polygons = [p for p in (_simplify_polygon(rings, tolerance) for rings in polygons) if p]
+    if not polygons:
+        return None
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def build_shapes(source, tolerance=TOLERANCE_DEGREES):
+    """FeatureCollection keyed by country_long_name from a source GeoJSON FeatureCollection"""
+    long_names = {common: long_name for long_name, common in NAME_ALIASES.items()}
+    features = []
+    for feature in source["features"]:
+        props = feature.get("properties") or {}
+        name = next((props[field] for field in SOURCE_NAME_FIELDS if props.get(field)), None)
+        geometry = feature.get("geometry")
+        if not name or not geometry or geometry["type"] not in ("Polygon", "MultiPolygon"):
+            continue
+        geometry = simplify_geometry(geometry, tolerance)
+        if geometry:
+            features.append({"type": "Feature", "properties": {"name": long_names.get(name, name)},
+                             "geometry": geometry})
+    return {"type": "FeatureCollection", "features": features}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python geo_shapes.py <countries.geojson> [tolerance_degrees]")
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        source = json.load(f)
+    shapes = build_shapes(source, float(sys.argv[2]) if len(sys.argv) > 2 else TOLERANCE_DEGREES)
+    os.makedirs(os.path.dirname(SHAPES_PATH), exist_ok=True)
+    with open(SHAPES_PATH, "w", encoding="utf-8") as f:
+        json.dump(shapes, f, separators=(",", ":"), ensure_ascii=False)
+    logger.info(f"✅ Wrote {len(shapes['features'])} country shapes to {SHAPES_PATH} "
+                f"({os.path.getsize(SHAPES_PATH) / 1024:.0f} KiB)")
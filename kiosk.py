@@ -0,0 +1,128 @@
+"""Server-rendered kiosk pages for low-power screens.
+
+/kiosk/kpi and /kiosk/map render the snapshot's view models as plain HTML
+and CSS: no Dash bundle, no mapbox, no script. The map page draws the
+countries as dots on a lat/long grid next to the ranked country list. Pages
+reload themselves with a meta refresh at the refresh policy's interval.
+
+Rendered pages are cached per (page, region, snapshot version), so serving
+one is a dict lookup until the next publish.
+"""
+import threading
+from collections import OrderedDict
+from html import escape
+
+from regions import region_label
+from view_format import TODAY_TILES, LY_TILES, tile_id, kpi_labels, map_labels
+
+PAGE_CACHE_SIZE = 32
+MAP_LITE_COUNTRIES = 25
+SVG_WIDTH = 720
+SVG_HEIGHT = 360
+
+_pages = OrderedDict()
+_lock = threading.Lock()
+
+STYLE = """
+body{margin:0;font-family:'Segoe UI',Arial,sans-serif;background:#f4f6f9;color:#111827}
+header{background:#005a99;color:#fff;padding:10px 20px;display:flex;justify-content:space-between;align-items:baseline}
+header h1{font-size:22px;margin:0}
+main{display:flex;gap:20px;padding:20px}
+section{flex:1}
+h2{background:#005a99;color:#fff;font-size:15px;text-align:center;margin:0 0 12px;padding:6px;border-radius:6px 6px 0 0}
+.tiles{display:grid;grid-template-columns:1fr 1fr;gap:12px}
+.tile{background:#E9ECF1;border:1px solid #cecfd4;border-radius:8px;padding:12px;text-align:center}
+.tile.green{background:#e6f4ea;border-color:#aed5b8}
+.tile.wide{grid-column:span 2}
+.label{font-size:13px;color:#4b5563}
+.value{font-size:30px;font-weight:700;margin-top:4px}
+.muted{color:#6b7280;font-size:13px}
+svg{background:#fff;border:1px solid #cecfd4;border-radius:8px;width:100%;height:auto}
+table{width:100%;border-collapse:collapse;background:#fff}
+td{padding:4px 8px;border-bottom:1px solid #eee;font-size:14px}
+td.count{text-align:right;font-weight:600;color:#00b050}
+"""
+
+
+def _page(title, refresh_seconds, header_right, body):
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<meta http-equiv=\"refresh\" content=\"{int(refresh_seconds)}\">"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">"
+        f"<title>{escape(title)}</title><style>{STYLE}</style></head><body>"
+        f"<header><h1>{escape(title)}</h1><span>{escape(header_right)}</span></header>"
+        f"<main>{body}</main></body></html>"
+    )
+
+
+def _tiles(text, period, tiles):
+    cells = []
+    for tile in tiles:
+        classes = "tile" + (" green" if tile.get("green") else "") + (" wide" if tile.get("wide") else "")
+        value = text.get(tile_id(tile["metric"], period), "-")
+        cells.append(f"<div class=\"{classes}\"><div class=\"label\">{escape(tile['title'].upper())}</div>"
+                     f"<div class=\"value\">{escape(value)}</div></div>")
+    return "".join(cells)
+
+
+def render_kpi(view, region, refresh_seconds):
+    text = {**kpi_labels({}), **view.get("text", {})}
+    body = (
+        f"<section style=\"flex:2\"><h2>{escape(text['kpi-since-label'])}</h2>"
+        f"<div class=\"tiles\">{_tiles(text, 'today', TODAY_TILES)}</div></section>"
+        f"<section><h2>LAST 12 MONTHS</h2><div class=\"tiles\">{_tiles(text, 'ly', LY_TILES)}</div>"
+        f"<p class=\"muted\">Today's live data: {escape(region_label(region))}</p></section>"
+    )
+    return _page("Auction Stats", refresh_seconds, text["kpi-updated-label"].strip(), body)
+
+
+def _dot_map(points):
+    """Countries as dots on an equirectangular lat/long grid"""
+    dots = []
+    for name, lat, lon, size, color in zip(points.get("names", []), points.get("lat", []), points.get("lon", []),
+                                           points.get("size", []), points.get("color", [])):
+        x = (lon + 180) / 360 * SVG_WIDTH
+        y = (90 - lat) / 180 * SVG_HEIGHT
+        dots.append(f"<circle cx=\"{x:.1f}\" cy=\"{y:.1f}\" r=\"{1.5 + size / 3:.1f}\" fill=\"{color}\" "
+                    f"fill-opacity=\"0.8\"><title>{escape(name)}</title></circle>")
+    grid = "".join(
+        f"<line x1=\"0\" y1=\"{y}\" x2=\"{SVG_WIDTH}\" y2=\"{y}\" stroke=\"#eef0f3\"/>"
+        for y in range(0, SVG_HEIGHT + 1, SVG_HEIGHT // 6)
+    ) + "".join(
+        f"<line x1=\"{x}\" y1=\"0\" x2=\"{x}\" y2=\"{SVG_HEIGHT}\" stroke=\"#eef0f3\"/>"
+        for x in range(0, SVG_WIDTH + 1, SVG_WIDTH // 12)
+    )
+    return f"<svg viewBox=\"0 0 {SVG_WIDTH} {SVG_HEIGHT}\">{grid}{''.join(dots)}</svg>"
+
+
+def render_map(view, region, refresh_seconds):
+    text = {**map_labels({}), **view.get("text", {})}
+    rows = "".join(
+        f"<tr><td>{escape(name)}</td><td class=\"count\">{escape(count)}</td></tr>"
+        for name, count in (view.get("panel") or [])[:MAP_LITE_COUNTRIES]
+    )
+    body = (
+        f"<section style=\"flex:2\">{_dot_map(view.get('points') or {})}</section>"
+        f"<section><h2>ACTIVE BIDDERS BY COUNTRY</h2><table>{rows}</table></section>"
+    )
+    return _page(f"Today's Active Bidders: {text['active-bidder-count']}", refresh_seconds,
+                 text["refresh-time-map"], body)
+
+
+RENDERERS = {"kpi": render_kpi, "map": render_map}
+
+
+def kiosk_page(page, view, version, region, refresh_seconds):
+    """Encoded HTML of a kiosk page, rendered once per snapshot version"""
+    key = (page, region, version, refresh_seconds)
+    with _lock:
+        if version is not None and key in _pages:
+            _pages.move_to_end(key)
+            return _pages[key]
+    body = RENDERERS[page](view, region, refresh_seconds).encode()
+    if version is not None:
+        with _lock:
+            _pages[key] = body
+            while len(_pages) > PAGE_CACHE_SIZE:
+                _pages.popitem(last=False)
+    return body
@@ -0,0 +1,71 @@
+import json
+import time
+from config import CONFIG, logger
+from redis_client import get_redis
+from regions import DEFAULT_REGION
+
+# Capped KPI time series for intraday trend lines. Each published snapshot's
+# "today" values are written as one point into a Redis sorted set scored by
+# bucket start time. Buckets are HISTORY_INTERVAL_SECONDS wide and the last
+# sample in a bucket wins, so the series is downsampled to a fixed interval
+# no matter how often the refresher runs. Only the newest HISTORY_MAX_POINTS
+# buckets are kept.
+HISTORY_KEY = "auction_kpi_history"
+HISTORY_INTERVAL_SECONDS = CONFIG.get("HISTORY_INTERVAL_SECONDS", 300)
+HISTORY_MAX_POINTS = CONFIG.get("HISTORY_MAX_POINTS", 288)
+
+
+def history_key(region=DEFAULT_REGION):
+    return HISTORY_KEY if region == DEFAULT_REGION else f"{HISTORY_KEY}:{region}"
+
+
+def _queue_record(pipe, kpis, ts, region):
+    """Queue the commands that write one point on a (sync or async) transaction"""
+    ts = time.time() if ts is None else ts
+    bucket = int(ts // HISTORY_INTERVAL_SECONDS) * HISTORY_INTERVAL_SECONDS
+    point = json.dumps({
+        "t": bucket,
+        "v": {metric: values.get("today") for metric, values in kpis.items()}
+    }, sort_keys=True)
+
+    key = history_key(region)
+    pipe.zremrangebyscore(key, bucket, bucket)
+    pipe.zadd(key, {point: bucket})
+    pipe.zremrangebyrank(key, 0, -(HISTORY_MAX_POINTS + 1))
+    return bucket
+
+
+def record_kpis(kpis, ts=None, region=DEFAULT_REGION):
+    """Append the 'today' KPI values to the series bucket containing ts"""
+    if not kpis:
+        return
+    pipe = get_redis().pipeline(transaction=True)
+    bucket = _queue_record(pipe, kpis, ts, region)
+    pipe.execute()
+    logger.debug(f"Recorded KPI history point for {region} bucket {bucket}")
+
+
+async def record_kpis_async(redis_conn, kpis, ts=None, region=DEFAULT_REGION):
+    """record_kpis through an async Redis client"""
+    if not kpis:
+        return
+    async with redis_conn.pipeline(transaction=True) as pipe:
+        bucket = _queue_record(pipe, kpis, ts, region)
+        await pipe.execute()
+    logger.debug(f"Recorded KPI history point for {region} bucket {bucket}")
+
+
+def get_series(metrics=None, since=None, region=DEFAULT_REGION):
+    """{metric: [[bucket_ts, value], ...]} oldest first, from the buffer only
+
+    ``metrics`` limits the result to those KPI keys; ``since`` is an epoch
+    timestamp lower bound.
+    """
+    points = get_redis().zrangebyscore(history_key(region), since if since is not None else "-inf", "+inf")
+    series = {}
+    for raw in points:
+        point = json.loads(raw)
+        for metric, value in point["v"].items():
+            if metrics is None or metric in metrics:
+                series.setdefault(metric, []).append([point["t"], value])
+    return series
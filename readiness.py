@@ -0,0 +1,113 @@
+"""Warm start and the /readyz report.
+
+A new pod hydrates its local snapshot tier from the newest Redis or file
+snapshot in a background thread instead of blocking on a BigQuery refresh.
+Regions with no snapshot anywhere get a (deduplicated) refresh enqueued.
+/readyz returns 503 until that has finished and every region has a
+snapshot.
+
+A pod with a stale snapshot stays ready, because taking every pod out of
+service during a BigQuery outage would swap stale tiles for none. Snapshot
+age against the staleness budget is reported in the body instead, and
+?strict=1 turns staleness into a 503 for monitors.
+"""
+import threading
+import time
+
+from config import CONFIG, logger
+from circuit_breaker import breaker_stats
+from refresh_jobs import enqueue_refresh
+from refresh_policy import load_state, LIVE_SECONDS
+from regions import REGIONS
+from snapshot_cache import get_sections, snapshot_source
+
+# A snapshot is stale once it is this much older than its refresh interval
+STALENESS_GRACE_SECONDS = CONFIG.get("STALENESS_GRACE_SECONDS", 300)
+
+_warm = {"started_at": None, "finished_at": None, "regions": {}}
+_warm_done = threading.Event()
+
+
+def warm_start():
+    """Load every region's snapshot into this process; enqueue a refresh if any has none"""
+    _warm["started_at"] = time.time()
+    for region in REGIONS:
+        try:
+            data = get_sections(region=region)
+        except Exception as e:
+            logger.warning(f"⚠️ Warm start read failed for {region}: {str(e)}")
+            data = {}
+        _warm["regions"][region] = snapshot_source(region) if data else None
+
+    if not all(_warm["regions"].values()):
+        logger.info("No cached snapshot found. Enqueuing refresh jobs.")
+        try:
+            enqueue_refresh(force=True)
+        except Exception as e:
+            logger.error(f"❌ Could not enqueue refresh: {str(e)}")
+    _warm["finished_at"] = time.time()
+    _warm_done.set()
+    logger.info(f"✅ Warm start finished in {_warm['finished_at'] - _warm['started_at']:.2f}s: {_warm['regions']}")
+
+
+def start_warm_start():
+    threading.Thread(target=warm_start, daemon=True, name="warm-start").start()
+
+
+def snapshot_status(region, now):
+    """Age of a region's snapshot against its staleness budget"""
+    data = get_sections(["refresh", "last_refreshed", "version"], region=region)
+    refresh = data.get("refresh") or {}
+    interval = refresh.get("interval_seconds") or LIVE_SECONDS
+    age = now - (refresh["next_due"] - interval) if refresh.get("next_due") else None
+    budget = interval + STALENESS_GRACE_SECONDS
+    return {
+        "version": data.get("version"),
+        "last_refreshed": data.get("last_refreshed"),
+        "source": snapshot_source(region) if data else None,
+        "age_seconds": round(age) if age is not None else None,
+        "budget_seconds": budget,
+        "fresh": age is not None and age <= budget,
+    }
+
+
+def refresher_status(now):
+    """Whether the refresher is keeping to its own schedule, and its breakers"""
+    breakers = {name: stats["state"] for name, stats in breaker_stats().items()}
+    try:
+        state = load_state()
+    except Exception as e:
+        return {"status": "unknown", "error": str(e), "breakers": breakers}
+    if not state.get("next_due"):
+        return {"status": "never_run", "breakers": breakers}
+    overdue = now - state["next_due"]
+    return {
+        "status": "overdue" if overdue > STALENESS_GRACE_SECONDS else "ok",
+        "last_refresh_at": state.get("refreshed_at"),
+        "overdue_seconds": max(0, round(overdue)),
+        "breakers": breakers,
+    }
+
+
+def readiness(strict=False):
+    """(report, HTTP status) for /readyz"""
+    now = time.time()
+    regions = {region: snapshot_status(region, now) for region in REGIONS}
+    has_data = all(status["version"] for status in regions.values())
+    fresh = all(status["fresh"] for status in regions.values())
+    ready = _warm_done.is_set() and has_data and (fresh or not strict)
+
+    if not _warm_done.is_set():
+        status = "warming"
+    elif not has_data:
+        status = "no_snapshot"
+    else:
+        status = "ok" if fresh else "stale"
+    report = {
+        "ready": ready,
+        "status": status,
+        "warm_start": dict(_warm),
+        "snapshots": regions,
+        "refresher": refresher_status(now),
+    }
+    return report, 200 if ready else 503
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+import yaml
+from redis import Redis, BlockingConnectionPool
+from redis import asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from config import logger
+
+CONFIG_PATH = os.path.join("config", "redis_config.yml")
+REQUIRED_KEYS = ["host", "port", "db", "password", "client_name"]
+
+# Re-entrant: get_redis() holds it while get_pool() creates the pool
+_lock = threading.RLock()
+_pool = None
+_client = None
+
+
+def load_redis_config(path=CONFIG_PATH):
+    """Read and validate the 'redis' section of config/redis_config.yml"""
+    try:
+        with open(path, "r") as f:
+            config = yaml.safe_load(f)
+    except FileNotFoundError:
+        logger.error(f"❌ Config file not found: {path}")
+        sys.exit(1)
+    except yaml.YAMLError as e:
+        logger.error(f"❌ Failed to parse YAML config: {e}")
+        sys.exit(1)
+
+    if "redis" not in config:
+        logger.error("❌ Missing 'redis' section in config file")
+        sys.exit(1)
+
+    redis_cfg = config["redis"]
+    for key in REQUIRED_KEYS:
+        if key not in redis_cfg:
+            logger.error(f"❌ Missing required key '{key}' in redis config")
+            sys.exit(1)
+    return redis_cfg
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """BlockingConnectionPool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().get_connection(*args, **kwargs)
+        except RedisConnectionError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self):
+        idle = sum(1 for conn in list(self.pool.queue) if conn is not None)
+        created = len(self._connections)
+        with self._stats_lock:
+            return {
+                "max_connections": self.max_connections,
+                "created": created,
+                "in_use": created - idle,
+                "idle": idle,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": 1000 * self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "wait_ms_max": 1000 * self.wait_seconds_max,
+            }
+
+
+def _pool_kwargs(redis_cfg):
+    return dict(
+        host=redis_cfg["host"],
+        port=redis_cfg["port"],
+        db=redis_cfg.get("db", 0),
+        password=os.getenv("REDIS_PASSWORD", redis_cfg.get("password")),
+        socket_timeout=redis_cfg.get("socket_timeout", 5),
+        socket_connect_timeout=redis_cfg.get("socket_connect_timeout", 5),
+        retry_on_timeout=redis_cfg.get("retry_on_timeout", True),
+        health_check_interval=redis_cfg.get("health_check_interval", 30),
+        client_name=redis_cfg.get("client_name", "g2-auctionStats"),
+        max_connections=redis_cfg.get("max_connections", 20),
+        timeout=redis_cfg.get("pool_timeout", 5),
+    )
+
+
+def get_pool():
+    """Process-wide connection pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = InstrumentedConnectionPool(**_pool_kwargs(load_redis_config()))
+    return _pool
+
+
+def get_redis():
+    """Shared Redis client; every module in the process reuses its pool"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = Redis(connection_pool=get_pool())
+    return _client
+
+
+def async_redis():
+    """New asyncio Redis client with its own pool
+
+    Async connections belong to the event loop that opened them, so this is
+    not shared; create it inside the loop and close it with ``aclose()``.
+    """
+    return aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(**_pool_kwargs(load_redis_config())))
+
+
+def set_many(entries):
+    """SET several keys in one round trip
+
+    ``entries`` is {key: (value, ttl)}; a ttl of None keeps the key without
+    an expiry.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    for key, (value, ttl) in entries.items():
+        pipe.set(key, value, ex=ttl)
+    return pipe.execute()
+
+
+def pool_stats():
+    return get_pool().stats() if _pool is not None else {}
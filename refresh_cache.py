@@ -3,21 +3,28 @@ import time
 import logging
 from datetime import datetime
 from cache_data import refresh_data
+from refresh_policy import is_due, seconds_until_due, LIVE_SECONDS
 
-logging.basicConfig(level=logging.INFO)
-
-INTERVAL_SECONDS = 300  # 5 minutes
+# The refresh policy decides when a refresh is due; this is only how often
+# to look again, and the pause after a failed refresh
+MIN_SLEEP_SECONDS = 5
 
 if __name__ == "__main__":
     logging.info("⏱ Starting custom scheduler...")
 
     while True:
-        try:
-            logging.info(f"🔁 Refreshing Redis cache at {datetime.utcnow().isoformat()} UTC")
-            refresh_data()
-            logging.info("✅ Cache refreshed successfully.")
-        except Exception as e:
-            logging.exception("❌ Error refreshing cache")
+        wait = MIN_SLEEP_SECONDS
+        if is_due():
+            try:
+                logging.info(f"🔁 Refreshing Redis cache at {datetime.utcnow().isoformat()} UTC")
+                if refresh_data():
+                    logging.info("✅ Cache refreshed successfully.")
+                else:
+                    wait = LIVE_SECONDS
+            except Exception as e:
+                logging.exception("❌ Error refreshing cache")
+                wait = LIVE_SECONDS
 
-        logging.info(f"🕒 Sleeping for {INTERVAL_SECONDS} seconds...")
-        time.sleep(INTERVAL_SECONDS)
\ No newline at end of file
+        wait = max(wait, seconds_until_due())
+        logging.info(f"🕒 Sleeping for {wait:.0f} seconds...")
+        time.sleep(wait)
\ No newline at end of file
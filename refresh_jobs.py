@@ -0,0 +1,199 @@
+"""Refresh as independent RQ jobs: one fetch job per dataset, then a publish.
+
+Each dataset (auction_stats -> kpis/grid/summary, and the country map) is
+fetched by its own job, which stages the result in Redis for that dataset's
+TTL. A dataset is due again once its staged result has expired, so each
+dataset runs on its own clock. A publish job, depending on the fetch jobs of
+the cycle, builds the snapshots from whatever is staged; a dataset with
+nothing staged keeps its last published values.
+
+Jobs have deterministic IDs ("refresh-<dataset>", "refresh-publish") and are
+only enqueued when no job with that ID is pending, so the queue never holds
+more than one refresh per dataset no matter how many schedulers or dashboard
+cache misses ask for one.
+"""
+import json
+
+from rq import Queue, Worker
+from rq.job import Dependency, Job, JobStatus
+from rq.exceptions import NoSuchJobError
+
+from config import CONFIG, logger
+from config.logging_setup import flush_logging
+from cache_data import (read_previous_snapshots, plan_map_refresh, merge_map_refresh,
+                        build_snapshots, publish_snapshots, fetch_stats, dataset_entries)
+from data_service import fetch_map_columns, fetch_map_columns_since, STATS_DATASETS
+from redis_client import get_redis, set_many
+from refresh_policy import is_due
+from regions import region_values
+
+QUEUE_NAME = "default"
+STAGE_KEY = "auction_stage"
+ENQUEUE_LOCK_KEY = "auction_refresh:enqueue"
+# RQ only accepts letters, digits, underscores and dashes in job IDs
+PUBLISH_JOB_ID = "refresh-publish"
+
+_dataset_ttls = CONFIG.get("DATASET_TTL_SECONDS", {})
+# How long a fetched dataset stays fresh, and the job that fetches it. The
+# stats job is due as soon as any auction_stats column group has expired;
+# fetch_stats then re-queries only the expired groups
+DATASETS = {
+    "stats": {"ttl": min(spec["ttl"] for spec in STATS_DATASETS.values()), "job": "refresh_jobs.fetch_stats_job"},
+    "map": {"ttl": _dataset_ttls.get("map", 300), "job": "refresh_jobs.fetch_map_job"},
+}
+
+JOB_TIMEOUT = CONFIG.get("QUERY_DEADLINE_SECONDS", 120) + 60
+PENDING_STATUSES = (JobStatus.QUEUED, JobStatus.STARTED, JobStatus.DEFERRED, JobStatus.SCHEDULED)
+
+
+def job_id(dataset):
+    return f"refresh-{dataset}"
+
+
+def stage_key(dataset):
+    return f"{STAGE_KEY}:{dataset}"
+
+
+def _stage_entry(dataset, value):
+    """set_many entry staging a dataset's result for its TTL"""
+    return {stage_key(dataset): (json.dumps(value), DATASETS[dataset]["ttl"])}
+
+
+def _read_stage(dataset):
+    raw = get_redis().get(stage_key(dataset))
+    return json.loads(raw) if raw is not None else None
+
+
+def queries_key(dataset):
+    return f"{stage_key(dataset)}:queries"
+
+
+def _take_queries(dataset):
+    """Queries run by the dataset's last fetch job, or 0 if a publish already took them
+
+    A staged result outlives the cycle that fetched it, so this tells the
+    publish job whether the stage is new since the previous publish.
+    """
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.get(queries_key(dataset))
+    pipe.delete(queries_key(dataset))
+    raw, _ = pipe.execute()
+    return int(raw) if raw is not None else 0
+
+
+# ------------------------------------------------------------------------
+# Jobs (run by RQ workers)
+
+class RefreshWorker(Worker):
+    """RQ worker that writes out queued log records before each work horse exits
+
+    Work horses leave through os._exit, so the logging listener is never
+    stopped by atexit and the job's last records would be dropped. Start
+    workers with ``rq worker -w refresh_jobs.RefreshWorker``.
+    """
+
+    def perform_job(self, job, queue):
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            flush_logging()
+
+
+def fetch_stats_job():
+    """Fetch auction_stats (only its expired column groups) for every region and stage it"""
+    columns, fetched = fetch_stats(region_values())
+    # Re-queried column groups and the staged result go out in one round trip
+    entries = dataset_entries(fetched)
+    if columns:
+        entries.update(_stage_entry("stats", columns))
+        entries[queries_key("stats")] = (len(fetched), DATASETS["stats"]["ttl"])
+    if entries:
+        set_many(entries)
+    return bool(columns)
+
+
+def fetch_map_job():
+    """Fetch (or incrementally update) the country map for every region and stage it"""
+    previous = read_previous_snapshots()
+    full, watermark = plan_map_refresh(previous)
+    if full:
+        fetched = fetch_map_columns(region_values())
+    else:
+        fetched = fetch_map_columns_since(watermark, region_values())
+    if fetched is None:
+        return False
+    maps = merge_map_refresh(previous, fetched, full)
+    entries = _stage_entry("map", {region: [columns, sync] for region, (columns, sync) in maps.items()})
+    entries[queries_key("map")] = (1, DATASETS["map"]["ttl"])
+    set_many(entries)
+    return True
+
+
+def publish_job():
+    """Build and publish every region's snapshot from the staged datasets"""
+    previous = read_previous_snapshots()
+    stats_columns = _read_stage("stats")
+    # Only a stage with re-queried column groups adds a KPI trend point; one
+    # already published (or rebuilt from kept groups alone) would repeat it
+    stats_queries = _take_queries("stats")
+    staged_maps = _read_stage("map") or {}
+    if all(region in staged_maps for region in previous):
+        maps = {region: tuple(staged_maps[region]) for region in previous}
+    else:
+        maps = merge_map_refresh(previous, None, False)
+    publish_snapshots(build_snapshots(previous, maps, stats_columns),
+                      record_history=bool(stats_columns and stats_queries),
+                      queries=stats_queries + _take_queries("map"))
+    return True
+
+
+# ------------------------------------------------------------------------
+# Enqueueing
+
+def _pending(job_id, connection):
+    """The job with this ID if it is still waiting or running, else None"""
+    try:
+        job = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        return None
+    return job if job.get_status() in PENDING_STATUSES else None
+
+
+def enqueue_refresh(force=False):
+    """Enqueue fetch jobs for expired datasets plus a publish job depending on them
+
+    Without ``force`` nothing is enqueued until the refresh policy says a
+    refresh is due, and only datasets whose staged result has expired are
+    fetched. Returns the IDs of the jobs that were enqueued.
+    """
+    redis_conn = get_redis()
+    if not force and not is_due():
+        return []
+    # Serialise concurrent callers so the pending checks below hold
+    if not redis_conn.set(ENQUEUE_LOCK_KEY, 1, nx=True, ex=30):
+        return []
+    try:
+        queue = Queue(QUEUE_NAME, connection=redis_conn)
+        fetch_jobs = []
+        enqueued = []
+        for dataset, spec in DATASETS.items():
+            if not force and redis_conn.exists(stage_key(dataset)):
+                continue
+            job = _pending(job_id(dataset), redis_conn)
+            if job is None:
+                job = queue.enqueue(spec["job"], job_id=job_id(dataset), job_timeout=JOB_TIMEOUT,
+                                    result_ttl=spec["ttl"], failure_ttl=3600)
+                enqueued.append(job.id)
+            fetch_jobs.append(job)
+
+        if fetch_jobs and _pending(PUBLISH_JOB_ID, redis_conn) is None:
+            # Publish even if a fetch job crashed; its dataset keeps the last good values
+            job = queue.enqueue("refresh_jobs.publish_job", job_id=PUBLISH_JOB_ID, job_timeout=JOB_TIMEOUT,
+                                depends_on=Dependency(jobs=fetch_jobs, allow_failure=True),
+                                result_ttl=60, failure_ttl=3600)
+            enqueued.append(job.id)
+        if enqueued:
+            logger.info(f"📥 Enqueued refresh jobs: {', '.join(enqueued)}")
+        return enqueued
+    finally:
+        redis_conn.delete(ENQUEUE_LOCK_KEY)
@@ -0,0 +1,178 @@
+"""Adaptive refresh cadence shared by every refresher and by the screens.
+
+After each refresh the policy looks at auction activity (auction_events_run
+and bids_received for today, per region). If either moved, or the clock is
+inside the configured LIVE_HOURS, the next refresh is due after
+REFRESH_LIVE_SECONDS. Otherwise the interval doubles (REFRESH_BACKOFF) up to
+REFRESH_MAX_SECONDS, so a static overnight snapshot costs a handful of
+BigQuery jobs instead of one every few minutes.
+
+The state lives in Redis because refreshers (refresh_cache.py loop, RQ jobs)
+are separate processes. The chosen interval is also published with the
+snapshot ("refresh" section) so screens can poll at the same pace.
+"""
+import json
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from config import CONFIG, logger
+from redis_client import get_redis
+
+POLICY_KEY = "auction_refresh_policy"
+
+LIVE_SECONDS = CONFIG.get("REFRESH_LIVE_SECONDS", 60)
+MAX_SECONDS = CONFIG.get("REFRESH_MAX_SECONDS", 1800)
+BACKOFF = CONFIG.get("REFRESH_BACKOFF", 2)
+LIVE_HOURS = CONFIG.get("LIVE_HOURS")
+POLICY_TZ = ZoneInfo((LIVE_HOURS or {}).get("timezone", "America/Chicago"))
+
+# Fixed cadence the policy replaced, the baseline for "jobs saved"
+BASELINE_SECONDS = 300
+# BigQuery jobs per refresh on that cadence: auction_stats and the country
+# map. Policy refreshes count the queries they actually ran instead (column
+# groups and staged datasets still within their TTL are not re-queried).
+BASELINE_JOBS_PER_REFRESH = 2
+HISTORY_DAYS = 7
+
+# Today's counters that show auctions are running
+ACTIVITY_METRICS = ("auction_events_run", "bids_received")
+
+
+def activity_fingerprint(kpis_by_region):
+    """{region: [auction_events_run, bids_received]} for today"""
+    return {
+        region: [kpis.get(metric, {}).get("today") for metric in ACTIVITY_METRICS]
+        for region, kpis in kpis_by_region.items()
+    }
+
+
+def in_live_hours(now):
+    if not LIVE_HOURS:
+        return False
+    local = datetime.fromtimestamp(now, POLICY_TZ)
+    if local.weekday() not in LIVE_HOURS.get("days", range(7)):
+        return False
+    return LIVE_HOURS["start"] <= local.strftime("%H:%M") < LIVE_HOURS["end"]
+
+
+def next_interval(state, fingerprint, now):
+    """(seconds until the next refresh, reason) given the previous policy state"""
+    previous = state.get("fingerprint")
+    if previous is None:
+        return LIVE_SECONDS, "startup"
+    if fingerprint != previous:
+        return LIVE_SECONDS, "activity"
+    if in_live_hours(now):
+        return LIVE_SECONDS, "schedule"
+    return min(MAX_SECONDS, state.get("interval_seconds", LIVE_SECONDS) * BACKOFF), "idle"
+
+
+def load_state():
+    """Policy state from Redis ({} if absent); raises on Redis errors"""
+    raw = get_redis().get(POLICY_KEY)
+    return json.loads(raw) if raw is not None else {}
+
+
+def _day_counts(entry):
+    """{"refreshes", "queries"} of a day in the policy state"""
+    if isinstance(entry, int):
+        # State written before queries were counted
+        return {"refreshes": entry, "queries": entry * BASELINE_JOBS_PER_REFRESH}
+    return dict(entry or {"refreshes": 0, "queries": 0})
+
+
+def after_refresh(kpis_by_region, now=None, queries=0):
+    """Record a completed refresh and return the interval to use next
+
+    ``queries`` is the number of BigQuery jobs the refresh ran. The returned
+    dict is published with the snapshot as its "refresh" section.
+    """
+    now = now or time.time()
+    try:
+        state = load_state()
+    except Exception as e:
+        logger.warning(f"⚠️ Refresh policy state unavailable: {e}")
+        state = {}
+
+    fingerprint = activity_fingerprint(kpis_by_region)
+    interval, reason = next_interval(state, fingerprint, now)
+
+    day = datetime.fromtimestamp(now, POLICY_TZ).strftime("%Y-%m-%d")
+    days = state.get("days", {})
+    counts = _day_counts(days.get(day))
+    counts["refreshes"] += 1
+    counts["queries"] += queries
+    days[day] = counts
+    for old_day in sorted(days)[:-HISTORY_DAYS]:
+        del days[old_day]
+
+    state.update({
+        "fingerprint": fingerprint,
+        "interval_seconds": interval,
+        "reason": reason,
+        "refreshed_at": now,
+        "next_due": now + interval,
+        "days": days,
+    })
+    try:
+        get_redis().set(POLICY_KEY, json.dumps(state))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save refresh policy state: {e}")
+    logger.info(f"🕒 Next refresh in {interval}s ({reason}, {queries} BigQuery jobs)")
+    return {"interval_seconds": interval, "reason": reason, "next_due": now + interval}
+
+
+def seconds_until_due(now=None):
+    """Seconds until the next refresh is due (0 if overdue or never run)"""
+    now = now or time.time()
+    try:
+        state = load_state()
+    except Exception as e:
+        logger.warning(f"⚠️ Refresh policy state unavailable: {e}")
+        return LIVE_SECONDS
+    return max(0.0, state.get("next_due", 0) - now)
+
+
+def is_due(now=None):
+    return seconds_until_due(now) <= 0
+
+
+def client_interval_ms(refresh):
+    """Poll interval for screens from a snapshot's "refresh" section (None if absent)
+
+    A replayed snapshot carries its replay ``speed``; the floor shrinks with
+    it so screens keep up with the sped-up timeline.
+    """
+    if not refresh or not refresh.get("interval_seconds"):
+        return None
+    return int(max(refresh["interval_seconds"], LIVE_SECONDS / refresh.get("speed", 1)) * 1000)
+
+
+def policy_stats(now=None):
+    """Current cadence and BigQuery jobs run vs the fixed BASELINE_SECONDS cadence, per day"""
+    now = now or time.time()
+    try:
+        state = load_state()
+    except Exception as e:
+        return {"error": str(e)}
+
+    local_now = datetime.fromtimestamp(now, POLICY_TZ)
+    today = local_now.strftime("%Y-%m-%d")
+    elapsed_today = local_now.hour * 3600 + local_now.minute * 60 + local_now.second
+    jobs = {}
+    for day, entry in sorted(state.get("days", {}).items()):
+        counts = _day_counts(entry)
+        baseline = (elapsed_today if day == today else 86400) // BASELINE_SECONDS * BASELINE_JOBS_PER_REFRESH
+        jobs[day] = {
+            "refreshes": counts["refreshes"],
+            "bigquery_jobs": counts["queries"],
+            "bigquery_jobs_fixed_cadence": baseline,
+            "bigquery_jobs_saved": baseline - counts["queries"],
+        }
+    return {
+        "interval_seconds": state.get("interval_seconds"),
+        "reason": state.get("reason"),
+        "next_due_in_seconds": max(0.0, state.get("next_due", 0) - now) if state else None,
+        "per_day": jobs,
+    }
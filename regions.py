@@ -0,0 +1,43 @@
+from urllib.parse import parse_qs
+from config import CONFIG
+from columnar import column_rows
+
+# Per-region snapshots. REGION_COLUMN names the column auction_stats and
+# auction_stats_cntry use to tell regions apart, and each REGIONS entry maps a
+# region key (the ?region= URL parameter) to its value in that column. All
+# regions are fetched together in one query per table and split afterwards.
+# Without REGION_COLUMN there is a single combined region.
+REGION_COLUMN = CONFIG.get("REGION_COLUMN")
+DEFAULT_REGION = CONFIG.get("DEFAULT_REGION", "all")
+REGIONS = CONFIG.get("REGIONS") or {DEFAULT_REGION: {"label": "US and Canada combined"}}
+
+
+def region_values():
+    """Column values to filter the batched queries on (None = no filter)"""
+    if not REGION_COLUMN:
+        return None
+    return [cfg["value"] for cfg in REGIONS.values()]
+
+
+def split_by_region(columns):
+    """Split a columns dict fetched for all regions into {region: columns}"""
+    if not REGION_COLUMN:
+        return {DEFAULT_REGION: columns}
+    by_value = {}
+    values = columns.get(REGION_COLUMN, [])
+    for row in range(column_rows(columns)):
+        by_value.setdefault(values[row], []).append(row)
+    return {
+        region: {name: [col[row] for row in by_value.get(cfg["value"], [])] for name, col in columns.items()}
+        for region, cfg in REGIONS.items()
+    }
+
+
+def resolve_region(search):
+    """Region key from a URL query string such as '?region=us'"""
+    region = parse_qs((search or "").lstrip("?")).get("region", [DEFAULT_REGION])[0]
+    return region if region in REGIONS else DEFAULT_REGION
+
+
+def region_label(region):
+    return REGIONS.get(region, {}).get("label", "")
@@ -0,0 +1,89 @@
+"""Shared memoisation of full-render callback outputs.
+
+update_kpi and update_map build the same layout and figure for every screen
+showing the same region. Their version-dependent parts are cached in Redis
+through flask_caching's RedisCache, on the process-wide connection pool. The
+key is callback + snapshot version + the inputs that change the output
+(region, map mode). N screens across every pod then cost one render per
+version.
+
+A new snapshot version is a new key, so a publish invalidates by
+construction. Old versions simply expire after RENDER_CACHE_TTL_SECONDS.
+Redis errors fall back to rendering in-process, and renders skip the cache
+for snapshot_cache's REDIS_RETRY_SECONDS window after one instead of each
+waiting out a connect timeout.
+"""
+import threading
+
+from flask_caching import Cache
+
+from config import CONFIG, logger
+from redis_client import get_redis
+from snapshot_cache import redis_available, mark_redis_down
+
+RENDER_CACHE_TTL = CONFIG.get("RENDER_CACHE_TTL_SECONDS", 900)
+KEY_PREFIX = "auction_render:"
+
+render_cache = Cache()
+_lock = threading.Lock()
+_stats = {}
+
+
+def init_render_cache(server):
+    render_cache.init_app(server, config={
+        "CACHE_TYPE": "RedisCache",
+        # A client instance instead of a host: reuse the shared pool
+        "CACHE_REDIS_HOST": get_redis(),
+        "CACHE_KEY_PREFIX": KEY_PREFIX,
+        "CACHE_DEFAULT_TIMEOUT": RENDER_CACHE_TTL,
+    })
+
+
+def _count(name, outcome):
+    with _lock:
+        counts = _stats.setdefault(name, {"hits": 0, "misses": 0, "uncached": 0, "skipped": 0, "errors": 0})
+        counts[outcome] += 1
+
+
+def cached_render(name, version, key, render):
+    """render() once per (callback name, snapshot version, key) across every pod
+
+    Without a version (no snapshot yet) there is nothing to key on, so the
+    result is rendered and not stored.
+    """
+    if version is None:
+        _count(name, "uncached")
+        return render()
+    if not redis_available():
+        _count(name, "skipped")
+        return render()
+    cache_key = f"{name}:{version}:{':'.join(map(str, key))}"
+    try:
+        value = render_cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"⚠️ Render cache read failed: {e}")
+        _count(name, "errors")
+        mark_redis_down(e)
+        return render()
+    if value is not None:
+        _count(name, "hits")
+        return value
+
+    _count(name, "misses")
+    value = render()
+    try:
+        render_cache.set(cache_key, value)
+    except Exception as e:
+        logger.warning(f"⚠️ Render cache write failed: {e}")
+        _count(name, "errors")
+        mark_redis_down(e)
+    return value
+
+
+def render_cache_stats():
+    with _lock:
+        stats = {name: dict(counts) for name, counts in _stats.items()}
+    for counts in stats.values():
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = counts["hits"] / lookups if lookups else 0.0
+    return stats
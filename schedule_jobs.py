@@ -1,10 +1,8 @@
 from rq_scheduler import Scheduler
-from redis import Redis
 from datetime import datetime
-from cache_data import refresh_data
-import os
-import yaml
-import sys
+from refresh_jobs import enqueue_refresh
+from refresh_policy import LIVE_SECONDS
+from redis_client import get_redis
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -15,65 +13,32 @@ print("⏱ Setting up RQ scheduler with proper configuration...")
 # redis_url = os.getenv("RQ_REDIS_URL", "redis://c-redis-dev4.copart.com:6379/0")
 # redis_conn = from_url(redis_url)
 
-config_path = os.path.join("config", "redis_config.yml")
-try:
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-except FileNotFoundError:
-    print(f"❌ Config file not found: {config_path}")
-    sys.exit(1)
-except yaml.YAMLError as e:
-    print(f"❌ Failed to parse YAML config: {e}")
-    sys.exit(1)
-
-# Validate Redis section
-if "redis" not in config:
-    print("❌ Missing 'redis' section in config file")
-    sys.exit(1)
-
-redis_cfg = config["redis"]
-
-# Required keys
-required_keys = ["host", "port", "db", "password", "client_name"]
-for key in required_keys:
-    if key not in redis_cfg:
-        print(f"❌ Missing required key '{key}' in redis config")
-        sys.exit(1)
-
-password = os.getenv("REDIS_PASSWORD", redis_cfg.get("password"))
-
-redis_conn = Redis(
-    host=redis_cfg["host"],
-    port=redis_cfg["port"],
-    db=redis_cfg.get("db", 0),
-    password=password,
-    socket_timeout=redis_cfg.get("socket_timeout", 5),
-    socket_connect_timeout=redis_cfg.get("socket_connect_timeout", 5),
-    retry_on_timeout=redis_cfg.get("retry_on_timeout", True),
-    client_name=redis_cfg.get("client_name", "g2-auctionStats")
-)
+# Shared, pooled Redis connection (same pool cache_data uses)
+redis_conn = get_redis()
 
 
 scheduler = Scheduler(connection=redis_conn)
 
 for job in scheduler.get_jobs():
-    if "refresh_data" in job.func_name:
+    if "cache_data.refresh" in job.func_name or "refresh_jobs." in job.func_name:
         scheduler.cancel(job)
         print(f"🗑 Cancelling existing job: {job.id}")
 
-# Schedule the job to run every 5 minutes
+# Tick at the fastest cadence. Each tick enqueues per-dataset fetch jobs and a
+# publish job once the refresh policy says a refresh is due, skipping datasets
+# that are still fresh or already queued (see refresh_jobs.py)
 job = scheduler.schedule(
     scheduled_time=datetime.utcnow(),
-    func=refresh_data,  # Pass the function directly, not as string
-    interval=300,  # 5 minutes in seconds
+    func=enqueue_refresh,  # Pass the function directly, not as string
+    interval=LIVE_SECONDS,
     repeat=None,  # Repeat indefinitely
     result_ttl=-1
 )
 
-print(f"✅ Scheduled refresh_data job: {job.id}")
-print("📅 Job will run every 5 minutes with result_ttl=-1")
+print(f"✅ Scheduled enqueue_refresh job: {job.id}")
+print(f"📅 Job will tick every {LIVE_SECONDS} seconds with result_ttl=-1")
 
-# Run once immediately
-refresh_data()
-print("✅ Initial refresh completed")
+# Refresh every dataset once immediately
+enqueue_refresh(force=True)
+print("✅ Initial refresh enqueued")
 # Start the RQ scheduler (blocking)
\ No newline at end of file
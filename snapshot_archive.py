@@ -0,0 +1,182 @@
+"""Record published snapshots to Parquet and replay them offline.
+
+With SNAPSHOT_ARCHIVE_DIR set, the refresher writes every snapshot it
+publishes to <dir>/<region>/<YYYYMMDD>/<epoch_ms>-<version>.parquet. The map
+columns are stored as the Parquet table (zstd). The other sections go in the
+file's key-value metadata. The view models and the refresh section are
+derived, so they are rebuilt on replay rather than stored.
+
+Replay publishes an archive back through the normal cache tiers, in order,
+with the original gaps divided by a speed multiple. Snapshot reads, the
+view models and the delta updates therefore all see a real auction day, with
+no BigQuery credentials or network. Each replayed snapshot gets a "refresh"
+section with the archived gap divided by the speed, so screens poll at the
+replay's pace. It writes to Redis when available, and the file tier of the
+replaying process is moved to REPLAY_SNAPSHOT_FILE so the live snapshot file
+is never overwritten. For a separately running dashboard (reading Redis):
+
+    python snapshot_archive.py archive/ --speed 30 --loop
+
+benchmarks/load_test.py --replay runs it inside the app under test.
+"""
+import argparse
+import glob
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import CONFIG, logger
+from regions import DEFAULT_REGION
+from refresh_policy import LIVE_SECONDS
+from snapshot_cache import publish, set_snapshot_file
+from view_format import build_views
+
+ARCHIVE_DIR = os.environ.get("SNAPSHOT_ARCHIVE_DIR") or CONFIG.get("SNAPSHOT_ARCHIVE_DIR")
+# Derived from the archived sections, so rebuilt on replay
+ARCHIVE_EXCLUDED = ("map", "refresh", "view_kpi", "view_map")
+METADATA_KEY = b"auction_snapshot"
+# File tier used while replaying, instead of the live snapshot file
+REPLAY_SNAPSHOT_FILE = os.path.join("cache", "replay", "auction_data.json")
+
+
+def archive_path(region, version, ts, archive_dir=ARCHIVE_DIR):
+    day = datetime.fromtimestamp(ts).strftime("%Y%m%d")
+    return os.path.join(archive_dir, region, day, f"{int(ts * 1000)}-{version}.parquet")
+
+
+def archive_snapshot(data, region=DEFAULT_REGION, archive_dir=ARCHIVE_DIR, ts=None):
+    """Write one published snapshot to the archive (no-op without an archive dir)"""
+    if not archive_dir:
+        return None
+    ts = ts or time.time()
+    sections = {name: value for name, value in data.items() if name not in ARCHIVE_EXCLUDED}
+    table = pa.table(data.get("map") or {})
+    table = table.replace_schema_metadata({
+        METADATA_KEY: json.dumps({"ts": ts, "region": region, "sections": sections}).encode()
+    })
+    path = archive_path(region, data.get("version"), ts, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_snapshots(snapshots, archive_dir=ARCHIVE_DIR):
+    """archive_snapshot for every region; archive failures never block a publish"""
+    if not archive_dir:
+        return
+    ts = time.time()
+    for region, data in snapshots.items():
+        try:
+            archive_snapshot(data, region, archive_dir, ts)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not archive snapshot for {region}: {str(e)}")
+
+
+def read_archived(path):
+    """(ts, region, snapshot) of an archived file, with its view models rebuilt"""
+    table = pq.read_table(path)
+    meta = json.loads(table.schema.metadata[METADATA_KEY])
+    data = dict(meta["sections"])
+    data["map"] = table.to_pydict()
+    data.update(build_views(data))
+    return meta["ts"], meta["region"], data
+
+
+def archive_files(archive_dir=ARCHIVE_DIR, regions=None):
+    """Archived files per region, oldest first ({region: [path, ...]})"""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(archive_dir, "*", "*", "*.parquet"))):
+        region = os.path.basename(os.path.dirname(os.path.dirname(path)))
+        if regions is None or region in regions:
+            files.setdefault(region, []).append(path)
+    return files
+
+
+def _timeline(files):
+    """(ts, path) across every region, in time order (file names start with epoch ms)"""
+    streams = [
+        [(int(os.path.basename(path).split("-", 1)[0]) / 1000, path) for path in paths]
+        for paths in files.values()
+    ]
+    return heapq.merge(*streams)
+
+
+class Replay(threading.Thread):
+    """Publishes an archive back into the cache tiers at `speed` times real time"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, speed=1.0, regions=None, loop=False,
+                 snapshot_file=REPLAY_SNAPSHOT_FILE):
+        super().__init__(daemon=True, name="snapshot-replay")
+        self.archive_dir = archive_dir
+        self.speed = speed
+        self.regions = regions
+        self.loop = loop
+        self.snapshot_file = snapshot_file
+        self.published = 0
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def _refresh_section(self, gap):
+        """The "refresh" section of a replayed snapshot: the archived gap at replay speed"""
+        interval = (gap or LIVE_SECONDS) / self.speed
+        return {"interval_seconds": interval, "reason": "replay", "next_due": time.time() + interval,
+                "speed": self.speed}
+
+    def _publish(self, data, region):
+        try:
+            publish(data, region=region)
+        except Exception as e:
+            # The file tier is written before Redis, so readers still get it
+            logger.warning(f"⚠️ Replay publish to Redis failed for {region}: {str(e)}")
+        self.published += 1
+
+    def run(self):
+        files = archive_files(self.archive_dir, self.regions)
+        if not files:
+            logger.error(f"❌ No archived snapshots under {self.archive_dir}")
+            return
+        set_snapshot_file(self.snapshot_file)
+        logger.info(f"▶️ Replaying {sum(len(p) for p in files.values())} snapshots at {self.speed:g}x")
+        while not self._halt.is_set():
+            previous_ts = {}
+            for ts, path in _timeline(files):
+                try:
+                    _, region, data = read_archived(path)
+                except Exception as e:
+                    logger.warning(f"⚠️ Skipping unreadable archive file {path}: {str(e)}")
+                    continue
+                gap = ts - previous_ts[region] if region in previous_ts else None
+                wait = ts - max(previous_ts.values()) if previous_ts else 0.0
+                if self._halt.wait(max(0.0, wait) / self.speed):
+                    return
+                previous_ts[region] = ts
+                data["refresh"] = self._refresh_section(gap)
+                self._publish(data, region)
+            if not self.loop:
+                logger.info(f"⏹ Replay finished ({self.published} snapshots published)")
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay archived snapshots into the cache tiers")
+    parser.add_argument("archive_dir", nargs="?", default=ARCHIVE_DIR)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiple")
+    parser.add_argument("--region", action="append", help="only these regions (repeatable)")
+    parser.add_argument("--loop", action="store_true", help="start over at the end of the archive")
+    args = parser.parse_args()
+    if not args.archive_dir:
+        parser.error("no archive dir given and SNAPSHOT_ARCHIVE_DIR is not set")
+    replay = Replay(args.archive_dir, args.speed, args.region, args.loop)
+    replay.start()
+    while replay.is_alive():
+        replay.join(1)
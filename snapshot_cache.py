@@ -0,0 +1,326 @@
+"""Read-through snapshot cache: in-process LRU -> Redis -> file.
+
+Reads try the tiers top-down and promote whatever they find into the tiers
+above it. Publishing writes through bottom-up (file, Redis, then local) so an
+upper tier never holds a version the tiers below it have not seen. The local
+tier is bounded (LRU) and entries expire after a short TTL, after which the
+next read goes back to Redis.
+
+Each region has its own snapshot (Redis key and file); the default region
+keeps the original names. Values returned from the cache are shared between
+callers; treat them as read-only.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from redis.exceptions import WatchError
+from config import CONFIG, logger
+from redis_client import get_redis
+from refresh_policy import MAX_SECONDS
+from regions import DEFAULT_REGION
+
+SNAPSHOT_KEY = "auction_snapshot"
+# Outlive the longest refresh interval the policy backs off to, so the shared
+# Redis snapshot never expires between refreshes and pods don't fall back to
+# (and re-promote) their own, possibly older, file tier
+SNAPSHOT_TTL_MARGIN = 300
+SNAPSHOT_TTL = MAX_SECONDS + SNAPSHOT_TTL_MARGIN
+SNAPSHOT_FILE = "cache/auction_data.json"
+# TTL for snapshots promoted from the file tier back into Redis
+PROMOTED_TTL = 60
+
+# Every field a snapshot can carry; reading sections=None means all of them
+SNAPSHOT_SECTIONS = ("kpis", "summary", "map", "map_sync", "grid", "country_rank", "last_refreshed", "refresh", "view_kpi", "view_map", "version")
+
+# Superseded versions keep these sections for a while, so clients that are
+# a few refreshes behind can be sent a diff instead of a full snapshot
+VERSION_SECTIONS = ("view_kpi", "view_map")
+VERSION_HISTORY_TTL = 3600
+
+# After a Redis error, skip the tier for this long instead of paying a
+# connect timeout on every read
+REDIS_RETRY_SECONDS = 10
+
+
+class TierStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def record(self, outcome, seconds):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.seconds_total += seconds
+            self.seconds_max = max(self.seconds_max, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.errors
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "latency_ms_avg": 1000 * self.seconds_total / lookups if lookups else 0.0,
+                "latency_ms_max": 1000 * self.seconds_max,
+            }
+
+
+def snapshot_key(region=DEFAULT_REGION):
+    return SNAPSHOT_KEY if region == DEFAULT_REGION else f"{SNAPSHOT_KEY}:{region}"
+
+
+def version_key(version, region=DEFAULT_REGION):
+    return f"{snapshot_key(region)}:v:{version}"
+
+
+def set_snapshot_file(path):
+    """Point this process's file tier at ``path`` (snapshot replay keeps its own copy)"""
+    global SNAPSHOT_FILE
+    SNAPSHOT_FILE = path
+
+
+def snapshot_file(region=DEFAULT_REGION):
+    if region == DEFAULT_REGION:
+        return SNAPSHOT_FILE
+    root, ext = os.path.splitext(SNAPSHOT_FILE)
+    return f"{root}.{region}{ext}"
+
+
+class LocalTier:
+    """Bounded LRU of (region, section) values, each tagged with its snapshot version"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, region, sections):
+        """All requested sections of a region from one version, or None"""
+        now = time.monotonic()
+        found = {}
+        versions = set()
+        with self._lock:
+            for name in sections:
+                entry = self._entries.get((region, name))
+                if entry is None or entry[2] < now:
+                    return None
+                self._entries.move_to_end((region, name))
+                versions.add(entry[0])
+                found[name] = entry[1]
+        return found if len(versions) == 1 else None
+
+    def put(self, region, version, values):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for name, value in values.items():
+                self._entries[(region, name)] = (version, value, expires)
+                self._entries.move_to_end((region, name))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def drop(self, region):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == region]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = LocalTier(
+    max_entries=CONFIG.get("LOCAL_CACHE_MAX_ENTRIES", 64),
+    ttl=CONFIG.get("LOCAL_CACHE_TTL_SECONDS", 10),
+)
+_stats = {"local": TierStats(), "redis": TierStats(), "file": TierStats()}
+_redis_down_until = 0.0
+_sources = {}
+
+
+# ------------------------------------------------------------------------
+# Redis tier
+
+def read_snapshot_sections(sections=None, region=DEFAULT_REGION):
+    """Read sections of the published snapshot from Redis ({} if absent)
+
+    ``sections`` is a list of field names; None reads the whole snapshot.
+    """
+    redis_conn = get_redis()
+    key = snapshot_key(region)
+    if sections is None:
+        raw = {k.decode(): v for k, v in redis_conn.hgetall(key).items()}
+    else:
+        raw = dict(zip(sections, redis_conn.hmget(key, list(sections))))
+    return {name: json.loads(value) for name, value in raw.items() if value is not None}
+
+
+def _redis_fields(data):
+    return {name: json.dumps(value) for name, value in data.items()}
+
+
+def _queue_publish(pipe, data, ttl, region):
+    """Queue the commands that replace a snapshot on a (sync or async) transaction"""
+    key = snapshot_key(region)
+    pipe.delete(key)
+    pipe.hset(key, mapping=_redis_fields(data))
+    pipe.expire(key, ttl)
+    if data.get("version"):
+        history = {name: data[name] for name in VERSION_SECTIONS if name in data}
+        pipe.set(version_key(data["version"], region), json.dumps(history), ex=VERSION_HISTORY_TTL)
+
+
+def publish_to_redis(data, ttl=SNAPSHOT_TTL, region=DEFAULT_REGION):
+    """Atomically replace every section field of the snapshot hash"""
+    pipe = get_redis().pipeline(transaction=True)
+    _queue_publish(pipe, data, ttl, region)
+    pipe.execute()
+
+
+def read_version(version, region=DEFAULT_REGION):
+    """VERSION_SECTIONS of an earlier snapshot version ({} once expired)"""
+    raw = get_redis().get(version_key(version, region))
+    return json.loads(raw) if raw is not None else {}
+
+
+def _promote_to_redis(data, region=DEFAULT_REGION):
+    """Seed Redis from the file tier, unless a refresher published meanwhile"""
+    key = snapshot_key(region)
+    with get_redis().pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, mapping=_redis_fields(data))
+            pipe.expire(key, PROMOTED_TTL)
+            pipe.execute()
+        except WatchError:
+            pass
+
+
+# ------------------------------------------------------------------------
+# File tier
+
+def read_snapshot_file(sections=None, region=DEFAULT_REGION):
+    """Read sections of the file backup of the snapshot ({} if absent)"""
+    try:
+        with open(snapshot_file(region), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if sections is None:
+        return data
+    return {name: data[name] for name in sections if name in data}
+
+
+def write_snapshot_file(data, region=DEFAULT_REGION):
+    path = snapshot_file(region)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# ------------------------------------------------------------------------
+# Read-through API
+
+def redis_available():
+    """False for REDIS_RETRY_SECONDS after a Redis error (shared with render_cache)"""
+    return time.monotonic() >= _redis_down_until
+
+
+def mark_redis_down(error):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    logger.warning(f"Redis unavailable, skipped for {REDIS_RETRY_SECONDS}s: {error}")
+
+
+def snapshot_source(region=DEFAULT_REGION):
+    """Where this process last loaded the region's snapshot from: "redis", "file",
+    "local" (published by this process) or None"""
+    return _sources.get(region)
+
+
+def get_sections(sections=None, region=DEFAULT_REGION):
+    """Read snapshot sections through local -> Redis -> file ({} on full miss)"""
+    sections = list(sections or SNAPSHOT_SECTIONS)
+    wanted = sections if "version" in sections else sections + ["version"]
+
+    started = time.perf_counter()
+    found = _local.get(region, wanted)
+    _stats["local"].record("hits" if found is not None else "misses", time.perf_counter() - started)
+    if found is not None:
+        return {name: found[name] for name in sections}
+
+    data = {}
+    if redis_available():
+        started = time.perf_counter()
+        try:
+            data = read_snapshot_sections(wanted, region)
+            _stats["redis"].record("hits" if data else "misses", time.perf_counter() - started)
+        except Exception as e:
+            _stats["redis"].record("errors", time.perf_counter() - started)
+            mark_redis_down(e)
+        if data:
+            _sources[region] = "redis"
+
+    if not data:
+        started = time.perf_counter()
+        data = read_snapshot_file(region=region)
+        _stats["file"].record("hits" if data else "misses", time.perf_counter() - started)
+        if not data:
+            _sources.pop(region, None)
+            return {}
+        _sources[region] = "file"
+        if redis_available():
+            try:
+                _promote_to_redis(data, region)
+            except Exception as e:
+                mark_redis_down(e)
+        data = {name: data[name] for name in wanted if name in data}
+
+    _local.put(region, data.get("version"), data)
+    return {name: data[name] for name in sections if name in data}
+
+
+def _publish_local(data, region):
+    _sources[region] = "local"
+    _local.drop(region)
+    _local.put(region, data.get("version"), {name: data[name] for name in SNAPSHOT_SECTIONS if name in data})
+
+
+def publish(data, ttl=SNAPSHOT_TTL, region=DEFAULT_REGION):
+    """Write a new snapshot through every tier (file, Redis, local)"""
+    write_snapshot_file(data, region)
+    publish_to_redis(data, ttl, region)
+    _publish_local(data, region)
+
+
+async def publish_async(redis_conn, data, ttl=SNAPSHOT_TTL, region=DEFAULT_REGION):
+    """publish() for the asyncio refresher, through an async Redis client
+
+    The file write runs in a worker thread so the event loop keeps going.
+    """
+    await asyncio.to_thread(write_snapshot_file, data, region)
+    async with redis_conn.pipeline(transaction=True) as pipe:
+        _queue_publish(pipe, data, ttl, region)
+        await pipe.execute()
+    _publish_local(data, region)
+
+
+def cache_stats():
+    stats = {tier: s.as_dict() for tier, s in _stats.items()}
+    stats["local"].update({"entries": len(_local), "evictions": _local.evictions})
+    return stats
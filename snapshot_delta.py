@@ -0,0 +1,135 @@
+"""Delta updates for dashboard screens.
+
+Each screen remembers the snapshot version it is showing and sends it with
+every tick. If the snapshot has moved on, the server answers with only what
+changed since that version (tile text, header labels, upserted and removed
+countries) and a clientside callback patches it into the page. Screens with
+no usable base (first load, another region, or a base version that has
+expired from Redis) are told to do a full render instead.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from config import logger
+from snapshot_cache import get_sections, read_version
+from view_format import SOURCE_SECTIONS, build_view, view_key
+
+# Every screen on the same (base, current) pair gets the same diff
+DIFF_CACHE_SIZE = 64
+
+_diffs = OrderedDict()
+_lock = threading.Lock()
+_stats = {}
+
+
+def load_view(view, region):
+    """(view model, version) of a region's snapshot, or (None, None) on a miss
+
+    Snapshots published before view models existed get theirs built from
+    the raw sections.
+    """
+    key = view_key(view)
+    found = get_sections([key, "version"], region=region)
+    if key in found:
+        return found[key], found.get("version")
+    raw = get_sections(SOURCE_SECTIONS[view] + ["version"], region=region)
+    if not raw:
+        return None, None
+    return build_view(view, raw), raw.get("version")
+
+
+def view_basis(view, sections):
+    """Everything a view shows that can change between snapshots"""
+    model = sections.get(view_key(view)) or build_view(view, sections)
+    basis = {"text": model["text"]}
+    if "countries" in model:
+        basis["countries"] = model["countries"]
+    return basis
+
+
+def diff_basis(old, new):
+    delta = {"text": {key: value for key, value in new["text"].items() if old["text"].get(key) != value}}
+    if "countries" in new:
+        before, after = old.get("countries", {}), new["countries"]
+        delta["countries"] = {
+            "upsert": {name: row for name, row in after.items() if before.get(name) != row},
+            "remove": [name for name in before if name not in after],
+        }
+    return delta
+
+
+def _diff_since(view, region, base_version, version, current):
+    """Diff from ``base_version`` to the view model ``current`` (None if the base is gone)"""
+    key = (view, region, base_version, version)
+    with _lock:
+        if key in _diffs:
+            _diffs.move_to_end(key)
+            return _diffs[key]
+    try:
+        base = read_version(base_version, region)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read snapshot version {base_version}: {e}")
+        return None
+    if not base:
+        delta = None
+    else:
+        delta = diff_basis(view_basis(view, base), view_basis(view, {view_key(view): current}))
+    with _lock:
+        _diffs[key] = delta
+        while len(_diffs) > DIFF_CACHE_SIZE:
+            _diffs.popitem(last=False)
+    return delta
+
+
+def build_delta(view, region, seen):
+    """Update for a screen showing ``seen`` ({"version", "region"}), or None if it is current
+
+    Returns either {"full": True, ...}, telling the screen to re-render, or
+    the changes since its version.
+    """
+    current, version = load_view(view, region)
+    if not version:
+        return None
+    seen = seen or {}
+    if seen.get("version") == version and seen.get("region") == region:
+        return None
+
+    delta = None
+    if seen.get("version") and seen.get("region") == region:
+        delta = _diff_since(view, region, seen["version"], version, current)
+    if delta is None:
+        payload = {"full": True, "version": version, "region": region}
+        _record(view, "resyncs", payload)
+    else:
+        payload = {"version": version, "region": region, **delta}
+        _record(view, "deltas", payload)
+    return payload
+
+
+def _record(view, kind, payload):
+    record_send(view, kind, len(json.dumps(payload, separators=(",", ":"))))
+
+
+def record_send(view, kind, nbytes):
+    """Count one payload of ``kind`` (deltas, resyncs, full_renders) sent to a screen"""
+    with _lock:
+        counts = _stats.setdefault(view, {}).setdefault(kind, [0, 0])
+        counts[0] += 1
+        counts[1] += nbytes
+
+
+def delta_stats():
+    """Per view: how many of each payload were sent and their average size in bytes"""
+    with _lock:
+        stats = {
+            view: {kind: {"count": count, "bytes_avg": nbytes / count if count else 0.0}
+                   for kind, (count, nbytes) in kinds.items()}
+            for view, kinds in _stats.items()
+        }
+    for kinds in stats.values():
+        full_avg = kinds.get("full_renders", {}).get("bytes_avg")
+        delta_avg = kinds.get("deltas", {}).get("bytes_avg")
+        if full_avg and delta_avg:
+            kinds["delta_to_full_ratio"] = delta_avg / full_avg
+    return stats
@@ -1,6 +1,7 @@
 #!/bin/bash
 
-# Run refresh_cache.py every 5 seconds in background
+# Keep refresh_cache.py running in background (restarted 5 seconds after it
+# exits); it refreshes on the cadence chosen by refresh_policy.py
 while true; do
   python /app/refresh_cache.py
   sleep 5
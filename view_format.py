@@ -0,0 +1,179 @@
+from zoneinfo import ZoneInfo
+import math
+import pandas as pd
+
+# Text shown on the KPI and map views. The publish step turns each snapshot
+# into one render-ready view model per view ("view_kpi", "view_map"
+# sections): formatted tile text, localised labels, sorted panel rows and map
+# points. Full renders and delta updates (snapshot_delta) are then lookups,
+# and a patched screen shows exactly what a fresh render would.
+
+LOCAL_TZ = ZoneInfo("America/Chicago")
+
+# KPI tiles in display order. "green" tiles use the money colour scheme and
+# "wide" spans the whole row.
+TODAY_TILES = [
+    {"title": "Bids Received", "metric": "bids_received", "icon": "/assets/img/bidsreceived.png"},
+    {"title": "Bidder Countries", "metric": "bidder_countries", "icon": "/assets/img/biddercountries.png"},
+    {"title": "Unique Bidders", "metric": "unique_bidders", "icon": "/assets/img/uniquebidders.png"},
+    {"title": "Auction Events Run", "metric": "auction_events_run", "icon": "/assets/img/auctionevents.png"},
+    {"title": "Highest Bid Placed", "metric": "highest_bid_placed", "currency": True, "green": True,
+     "icon": "/assets/img/highestbid.png"},
+    {"title": "Transaction Value", "metric": "net_value_sold", "currency": True, "green": True,
+     "icon": "/assets/img/netvalue.png"},
+    {"title": "Total Dollars Bid", "metric": "dollars_bid", "currency": True, "green": True,
+     "icon": "/assets/img/totaldollars.png", "wide": True},
+]
+LY_TILES = [
+    {"title": "Unique Bidders", "metric": "unique_bidders"},
+    {"title": "Total Bids", "metric": "bids_received"},
+    {"title": "Transaction Value", "metric": "net_value_sold", "currency": True, "green": True},
+    {"title": "Dollars Bid", "metric": "dollars_bid", "currency": True, "green": True},
+]
+
+
+# Raw snapshot sections each view model is built from
+SOURCE_SECTIONS = {
+    "kpi": ["kpis", "summary"],
+    "map": ["map", "summary", "country_rank"],
+}
+# Per-country row of the map model, in this order
+MAP_ROW_FIELDS = ("lat", "long", "bid_counts", "unique_bidders", "dollars_bid", "highest_bid_placed")
+MIN_MARKER_SIZE = 2
+MAX_MARKER_SIZE = 25
+
+
+def format_value(value, is_currency=False):
+    return f"${value:,.0f}" if is_currency else f"{value:,.0f}"
+
+
+def tile_id(metric, period):
+    """DOM id of the value element of a KPI tile"""
+    return f"tile-{metric}-{period}"
+
+
+def tile_values(kpis):
+    """{tile id: display text} for every KPI tile"""
+    values = {}
+    for period, tiles in (("today", TODAY_TILES), ("ly", LY_TILES)):
+        for tile in tiles:
+            value = kpis.get(tile["metric"], {}).get(period)
+            if value is not None:
+                values[tile_id(tile["metric"], period)] = format_value(value, tile.get("currency", False))
+    return values
+
+
+def kpi_timestamp(summary):
+    """(date, time) of the last update in Chicago time, or ("", "")"""
+    raw_ts = (summary or {}).get("last_up_date")
+    if not raw_ts:
+        return "", ""
+    try:
+        parsed_dt = pd.to_datetime(raw_ts, utc=True).astimezone(LOCAL_TZ)
+        return parsed_dt.strftime("%b %d, %Y"), parsed_dt.strftime("%I:%M %p")
+    except Exception:
+        return "", ""
+
+
+def kpi_labels(summary):
+    """Text of the date/time labels on the KPI view, keyed by element id"""
+    now_date, now_time = kpi_timestamp(summary)
+    return {
+        "refresh-time-kpi": f"Last Updated: {now_date} | {now_time} ",
+        "kpi-since-label": f"SINCE 12:00:00 AM TODAY, {now_date}",
+        "kpi-updated-label": f" Last Updated: {now_date} | {now_time}",
+    }
+
+
+def map_labels(summary):
+    """Text of the header labels on the map view, keyed by element id"""
+    summary = summary or {}
+    bidders_val = summary.get("bidders")
+    try:
+        updated = (
+            pd.to_datetime(summary["last_up_date"])
+            .tz_localize("UTC")
+            .astimezone(LOCAL_TZ)
+            .strftime("Last Updated: %b %d, %Y %I:%M %p") if summary.get("last_up_date") else "Last Updated: -"
+        )
+    except Exception:
+        updated = "Last Updated: -"
+    return {
+        "refresh-time-map": updated,
+        "active-bidder-count": f"{int(bidders_val):,}" if bidders_val else "-",
+    }
+
+
+def map_model(map_columns):
+    """{country: [lat, long, bid_counts, unique_bidders, dollars_bid, highest_bid_placed]}"""
+    names = map_columns.get("country_long_name", [])
+    fields = [map_columns.get(name, [None] * len(names)) for name in MAP_ROW_FIELDS]
+    model = {}
+    for pos, country in enumerate(names):
+        if country is None:
+            continue
+        # NaN -> None, so unchanged rows compare equal and the JSON stays valid
+        row = [None if isinstance(value, float) and math.isnan(value) else value
+               for value in (values[pos] for values in fields)]
+        row[0] = round(row[0], 2) if row[0] is not None else None
+        row[1] = round(row[1], 2) if row[1] is not None else None
+        model[country] = row
+    return model
+
+
+def map_points(countries):
+    """Marker arrays for the map: countries with a position, sized by unique bidders"""
+    names = [name for name, row in countries.items() if None not in row[:3]]
+    bidders = [countries[name][3] or 0 for name in names]
+    low, high = min(bidders, default=0), max(bidders, default=0)
+    return {
+        "names": names,
+        "lat": [countries[name][0] for name in names],
+        "lon": [countries[name][1] for name in names],
+        "size": [
+            MIN_MARKER_SIZE if low == high
+            else MIN_MARKER_SIZE + (count - low) * (MAX_MARKER_SIZE - MIN_MARKER_SIZE) / (high - low)
+            for count in bidders
+        ],
+        "color": ["#00b050" if count > 0 else "#00ff00" for count in bidders],
+        "customdata": [[name] + countries[name][2:] for name in names],
+    }
+
+
+def kpi_view_model(sections):
+    return {"text": {**tile_values(sections.get("kpis") or {}), **kpi_labels(sections.get("summary"))}}
+
+
+def map_view_model(sections):
+    countries = map_model(sections.get("map") or {})
+    points = map_points(countries)
+    rank = sections.get("country_rank") or []
+    return {
+        "text": map_labels(sections.get("summary")),
+        "countries": countries,
+        "points": points,
+        "center": {
+            "lat": sum(points["lat"]) / len(points["lat"]),
+            "lon": sum(points["lon"]) / len(points["lon"]),
+        } if points["names"] else None,
+        # Info panel rows, most bidders first
+        "rank": rank,
+        "panel": [[name, f"{count:,}"] for name, count in rank],
+    }
+
+
+VIEW_BUILDERS = {"kpi": kpi_view_model, "map": map_view_model}
+
+
+def view_key(view):
+    """Snapshot section holding a view's model"""
+    return f"view_{view}"
+
+
+def build_view(view, sections):
+    return VIEW_BUILDERS[view](sections)
+
+
+def build_views(data):
+    """Every view model of a snapshot, keyed by section name"""
+    return {view_key(view): build_view(view, data) for view in VIEW_BUILDERS}